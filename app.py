@@ -1,65 +1,133 @@
 import streamlit as st
 import sys
 import os
-from openai import OpenAI
 import datetime
-import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # Import the search_and_extract function from google-latest.py
-from data.google_scrape import search_and_extract
+from data.google_scrape import search_and_extract, search_urls, SEARCH_RESULTS
+from data.clients import get_openai_client
+from data.llm_cache import cached_chat_completion
+from data.dedup import deduplicate_articles
+from data.ranking import focus_articles
+from data.report import reduce_to_budget, stream_report
+from data.metrics import track_stage, render_prometheus, summary as metrics_summary
+from data.article_store import get_article_store, store_texts, load_texts, store_articles, load_articles
+from data.pipeline import stream_pipeline
+from data.rate_limit import INTERACTIVE
 
-# Initialize OpenAI client
-client = OpenAI()
+# Default maximum number of distillation requests in flight at the same time
+MAX_CONCURRENT_DISTILLATIONS = 4
 
-def distill_individual_article(article, user_query):
+# Reasoning model used to distill each article
+DISTILLATION_MODEL = "o1"
+
+# Shown in place of a stored text that has been pruned from the article store
+MISSING_TEXT = "*This content is no longer available; run the search again.*"
+
+def distillation_messages(article, user_query):
     """
-    Process individual article with OpenAI o1 model to extract all relevant information
+    Chat messages asking the reasoning model to distill one article
     """
     # Create prompt for reasoning model
     prompt = f"""
     Analyze the following news article content and extract ALL relevant information, facts, and insights,
     even if they seem only tangentially related to the query: "{user_query}"
     
-    SOURCE URL: {article['url']}
-    PUBLICATION DATE: {article['publication_date']}
+    SOURCE URL: {article.url}
+    PUBLICATION DATE: {article.publication_date}
     
     CONTENT:
-    {article['content']}
+    {article.content}
     
     Distill this article into key facts, quotes, statistics, and insights. Be comprehensive and capture ALL useful information,
     not just what seems immediately relevant to the query. Format your response as a bulleted list of clear, concise points.
     """
     
+    return [
+        {"role": "user", "content": "You are an expert analyst who extracts and distills all key information from content. Be thorough and comprehensive."},
+        {"role": "user", "content": prompt}
+    ]
+
+def distilled_article(article, distilled_content):
+    """
+    Record of a distilled article as kept in session state and passed to the report
+    """
+    return {
+        "url": article.url,
+        "publication_date": article.publication_date,
+        "duplicate_urls": list(article.duplicate_urls),
+        "distilled_content": distilled_content
+    }
+
+def distill_individual_article(article, user_query, priority=INTERACTIVE):
+    """
+    Process individual article with OpenAI o1 model to extract all relevant information
+    """
     try:
         # Using o1 model as the reasoning model to distill information from each article
-        response = client.chat.completions.create(
-            model="o1",  # Changed to o1 model for distillation
-            messages=[
-                {"role": "user", "content": "You are an expert analyst who extracts and distills all key information from content. Be thorough and comprehensive."},
-                {"role": "user", "content": prompt}
-            ]
-        )
-        return {
-            "url": article['url'],
-            "publication_date": article['publication_date'],
-            "distilled_content": response.choices[0].message.content
-        }
+        with track_stage("distillation"):
+            distilled_content = cached_chat_completion(
+                get_openai_client(),
+                model=DISTILLATION_MODEL,
+                messages=distillation_messages(article, user_query),
+                priority=priority
+            )
+        return distilled_article(article, distilled_content)
     except Exception as e:
-        return {
-            "url": article['url'],
-            "publication_date": article['publication_date'],
-            "distilled_content": f"Error in distillation: {str(e)}"
+        return distilled_article(article, f"Error in distillation: {str(e)}")
+
+def distill_focused_article(article, user_query):
+    """
+    Distill one article on its own, sending only its chunks most relevant to the query
+    """
+    return distill_individual_article(focus_articles([article], user_query)[0], user_query)
+
+def distill_articles(articles, user_query, max_workers=MAX_CONCURRENT_DISTILLATIONS, focus=True, executor=None,
+                     priority=INTERACTIVE):
+    """
+    Distill several articles concurrently, yielding (index, distilled_article) pairs as soon as
+    each distillation completes. The index is the article's position in the input list.
+    With focus=True only the chunks most relevant to the query are sent for each article.
+    A shared executor can be passed to bound the number of requests in flight across calls.
+    priority is the rate-limit scheduler priority of the requests (INTERACTIVE or BATCH).
+    """
+    if focus:
+        articles = focus_articles(articles, user_query)
+    
+    if executor is not None:
+        futures = {
+            executor.submit(distill_individual_article, article, user_query, priority): i
+            for i, article in enumerate(articles)
         }
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+        return
+    
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        yield from distill_articles(articles, user_query, focus=False, executor=executor, priority=priority)
 
-def generate_report_from_distilled_content(distilled_articles, user_query):
+def stream_report_from_distilled_content(distilled_articles, user_query, priority=INTERACTIVE):
     """
-    Generate a comprehensive report from all distilled article content
+    Generate a comprehensive report from all distilled article content, yielding the text as it is generated
     """
     # Prepare distilled content for the report generation model
-    combined_distilled_content = "\n\n".join([
-        f"Source: {item['url']}\nDate: {item['publication_date']}\n{item['distilled_content']}" 
+    sections = [
+        f"Source: {item['url']}\nDate: {item['publication_date']}\n"
+        + (f"Also published at: {', '.join(item['duplicate_urls'])}\n" if item.get('duplicate_urls') else "")
+        + item['distilled_content']
         for item in distilled_articles
-    ])
+    ]
+    
+    try:
+        # Summarize batches of sources in parallel until they fit in the report token budget
+        with track_stage("report_reduce"):
+            sections = reduce_to_budget(sections, user_query, priority=priority)
+    except Exception as e:
+        yield f"Error in report generation: {str(e)}"
+        return
+    
+    combined_distilled_content = "\n\n".join(sections)
     
     # Create prompt for report generation
     prompt = f"""
@@ -74,19 +142,116 @@ def generate_report_from_distilled_content(distilled_articles, user_query):
     """
     
     try:
-        # Using o1 model for generating the final report
-        response = client.chat.completions.create(
-            model="gpt-4-turbo",  # Changed to o1 model for report generation
-            messages=[
-                {"role": "system", "content": "You are an expert analyst who creates detailed, well-structured reports based on distilled information."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=4000,
-            temperature=0.5
-        )
-        return response.choices[0].message.content
+        # Using gpt-4-turbo for generating the final report
+        with track_stage("report"):
+            yield from stream_report(
+                prompt,
+                "You are an expert analyst who creates detailed, well-structured reports based on distilled information.",
+                priority=priority
+            )
     except Exception as e:
-        return f"Error in report generation: {str(e)}"
+        yield f"Error in report generation: {str(e)}"
+
+def generate_report_from_distilled_content(distilled_articles, user_query, priority=INTERACTIVE):
+    """
+    Generate a comprehensive report from all distilled article content
+    """
+    return "".join(stream_report_from_distilled_content(distilled_articles, user_query, priority))
+
+def run_streaming_pipeline(user_query, want_recent):
+    """
+    Search, fetch, distill and report with overlapping stages, rendering progress as it goes.
+    Articles are distilled as soon as they are downloaded, and the report starts once a quorum
+    of sources is distilled while the remaining ones keep distilling.
+    """
+    urls = search_urls(user_query, want_recent)
+    if not urls:
+        st.session_state.search_results = []
+        st.warning("No results found for your query.")
+        return
+    
+    pipeline_status = st.empty()
+    progress_bar = st.progress(0)
+    
+    articles = [None] * len(urls)
+    distilled = {}
+    failed = 0
+    skipped_duplicates = 0
+    report_sources = []
+    report = None
+    
+    for event, i, payload in stream_pipeline(urls, lambda article: distill_focused_article(article, user_query),
+                                             max_distillations=MAX_CONCURRENT_DISTILLATIONS):
+        if event == "fetched":
+            articles[i] = payload
+            failed += not payload.ok
+        elif event == "duplicate":
+            skipped_duplicates += 1
+        elif event == "distilled":
+            distilled[i] = payload
+        elif event == "quorum":
+            # Start the report from the sources ready so far; the others keep distilling meanwhile
+            report_sources = payload
+            pipeline_status.info(f"Generating the report from {len(report_sources)} sources "
+                                 f"while the remaining articles are distilled...")
+            st.subheader("Generated Report")
+            report = st.write_stream(stream_report_from_distilled_content(report_sources, user_query))
+        
+        fetched = sum(1 for article in articles if article is not None)
+        progress_bar.progress((len(distilled) + failed + skipped_duplicates) / len(urls))
+        pipeline_status.info(f"Fetched {fetched}/{len(urls)} pages, distilled {len(distilled)} "
+                             f"({failed} failed, {skipped_duplicates} near-duplicates skipped)")
+    
+    # Keep only references in session state, in rank order, as the step-by-step mode does
+    st.session_state.search_results = store_articles([article for article in articles if article is not None])
+    st.session_state.distilled_articles = store_texts([distilled[i] for i in sorted(distilled)], "distilled_content")
+    st.session_state.report_ref = get_article_store().put(report) if report else None
+    
+    late = len(distilled) - len(report_sources)
+    pipeline_status.success(f"Report based on {len(report_sources)} of {len(distilled)} distilled sources.")
+    if late:
+        st.info(f"{late} sources finished after the report started; generate the report again in the "
+                f"'Generate Report' tab to include them.")
+
+def fetch_warning(article):
+    """
+    Suffix marking a search result whose page could not be fetched
+    """
+    if article.forbidden:
+        return " ⚠️ (Access Forbidden)"
+    if not article.ok:
+        return f" ⚠️ ({article.error})"
+    return ""
+
+def show_metrics_panel():
+    """
+    Show per-stage latency, bytes, tokens and cache counters of the current run in the sidebar:
+    everything recorded since the session's last search, including its distillation and report
+    """
+    metrics_start = st.session_state.get("metrics_start")
+    metrics = metrics_summary(since=metrics_start) if metrics_start else None
+    with st.sidebar.expander("Pipeline metrics", expanded=False):
+        if not metrics or not metrics["stages"]:
+            st.write("No pipeline stage has run yet in this session.")
+            return
+        
+        st.caption("Since the last search. The counters are shared by the whole server, so work of other "
+                   "sessions running at the same time is included.")
+        st.table({
+            "stage": list(metrics["stages"]),
+            "calls": [m["calls"] for m in metrics["stages"].values()],
+            "total (s)": [m["total_seconds"] for m in metrics["stages"].values()],
+            "mean (s)": [m["mean_seconds"] for m in metrics["stages"].values()],
+            "errors": [m["errors"] for m in metrics["stages"].values()],
+        })
+        st.write(f"**Downloaded:** {metrics['downloaded_bytes'] / 1024:.1f} KB")
+        st.write(f"**Tokens:** {metrics['tokens'].get('prompt', 0)} prompt, {metrics['tokens'].get('completion', 0)} completion")
+        if metrics["llm_retries"]:
+            st.write(f"**OpenAI retries:** {metrics['llm_retries']}")
+        for cache, results in metrics["caches"].items():
+            st.write(f"**{cache.upper()} cache:** " + ", ".join(f"{count} {result}" for result, count in sorted(results.items())))
+        
+        st.download_button("Download Prometheus metrics", render_prometheus(), file_name="metrics.prom", mime="text/plain")
 
 def main():
     st.title("News Search and Analysis Application")
@@ -94,6 +259,9 @@ def main():
     # Get user inputs
     user_query = st.text_input("Enter your search query:")
     want_recent = st.checkbox("Do you want only recent news?")
+    streaming = st.checkbox("Distill while downloading and start the report once most sources are ready")
+    adaptive = st.checkbox(f"Fetch extra candidates and stop once {SEARCH_RESULTS} usable sources are in",
+                           disabled=streaming)
     
     # Create a search button
     search_button = st.button("Search")
@@ -102,18 +270,31 @@ def main():
     if 'distillation_in_progress' not in st.session_state:
         st.session_state.distillation_in_progress = False
     
-    # When search button is clicked and query is not empty
+    # A search starts a new run; the metrics panel shows the counters recorded since then
     if search_button and user_query:
+        st.session_state.metrics_start = metrics_summary()
+        st.session_state.report_ref = None
+    
+    # Run all stages at once, overlapping downloads, distillation and the report
+    if search_button and user_query and streaming:
+        with st.spinner("Searching, distilling and reporting..."):
+            try:
+                run_streaming_pipeline(user_query, want_recent)
+            except Exception as e:
+                st.error(f"An error occurred: {str(e)}")
+    
+    # When search button is clicked and query is not empty
+    elif search_button and user_query:
         with st.spinner("Searching for news..."):
             try:
                 # Call the search_and_extract function with user inputs
-                results = search_and_extract(user_query, want_recent)
+                results = search_and_extract(user_query, want_recent, min_usable=SEARCH_RESULTS if adaptive else None)
                 
-                # Store results in session state for later use
-                st.session_state.search_results = results
+                # Keep only references in session state; the bodies go to the shared article store
+                st.session_state.search_results = store_articles(results)
                 
-                # Filter out forbidden URLs for display count
-                accessible_results = [r for r in results if not r['content'].startswith("Error: HTTP error 403 Client Error: Forbidden for url:")]
+                # Count the pages that could be fetched
+                accessible_results = [r for r in results if r.ok]
                 
                 # Display the results
                 if results:
@@ -129,8 +310,8 @@ def main():
     if hasattr(st.session_state, 'search_results') and st.session_state.search_results:
         results = st.session_state.search_results
         
-        # Filter out forbidden URLs for display count
-        accessible_results = [r for r in results if not r['content'].startswith("Error: HTTP error 403 Client Error: Forbidden for url:")]
+        # Count the pages that could be fetched
+        accessible_results = [r for r in results if r.ok]
         
         st.success(f"Found {len(results)} results total, {len(accessible_results)} accessible")
         
@@ -141,25 +322,30 @@ def main():
             # Display just the URLs
             st.subheader("URLs")
             for i, item in enumerate(results, 1):
-                # Add indicator for forbidden URLs
-                if item['content'].startswith("Error: HTTP error 403 Client Error: Forbidden for url:"):
-                    st.write(f"{i}. {item['url']} ⚠️ (Access Forbidden)")
-                else:
-                    st.write(f"{i}. {item['url']}")
+                # Add indicator for pages that could not be fetched
+                st.write(f"{i}. {item.url}{fetch_warning(item)}")
         
         with tab2:
             # Display detailed information
             st.subheader("Detailed Results")
             for i, item in enumerate(results, 1):
-                # Add indicator for forbidden URLs in the expander title
-                title = f"Result {i}: {item['url']}"
-                if item['content'].startswith("Error: HTTP error 403 Client Error: Forbidden for url:"):
-                    title += " ⚠️ (Access Forbidden)"
-                
-                with st.expander(title):
-                    st.write(f"**URL:** {item['url']}")
-                    st.write(f"**Publication Date:** {item['publication_date']}")
-                    st.text_area(f"Content {i}", item['content'], height=200)
+                # Add indicator for pages that could not be fetched in the expander title
+                with st.expander(f"Result {i}: {item.url}{fetch_warning(item)}"):
+                    st.write(f"**URL:** {item.url}")
+                    st.write(f"**Publication Date:** {item.publication_date}")
+                    st.write(f"**Fetch:** HTTP {item.status_code or '-'}, {item.size / 1024:.1f} KB in {item.elapsed:.2f}s"
+                             + (" (cached)" if item.from_cache else ""))
+                    
+                    if not item.ok:
+                        st.write(f"**Error:** {item.message}")
+                    
+                    # Load the body from the article store only when asked for
+                    elif st.checkbox("Show content", key=f"show_content_{i}_{item.content_ref}"):
+                        content = get_article_store().get(item.content_ref)
+                        if content is None:
+                            st.markdown(MISSING_TEXT)
+                        else:
+                            st.text_area(f"Content {i}", content, height=200)
         
         with tab3:
             st.subheader("Distilled Article Content")
@@ -171,6 +357,10 @@ def main():
             # Container for detailed progress messages
             detailed_progress = st.container()
             
+            # Maximum number of articles distilled at the same time
+            max_in_flight = st.slider("Parallel distillation requests", min_value=1, max_value=10,
+                                      value=MAX_CONCURRENT_DISTILLATIONS)
+            
             # Only show distill button if not currently distilling
             if not st.session_state.distillation_in_progress:
                 if st.button("Distill Articles"):
@@ -182,53 +372,52 @@ def main():
             
             # If distillation is in progress, show the progress and perform the distillation
             if st.session_state.distillation_in_progress:
-                # Filter out content with 403 errors
-                filtered_content = [item for item in results if not item['content'].startswith("Error: HTTP error 403 Client Error: Forbidden for url:")]
+                # Leave out pages that could not be fetched and load the remaining bodies from the article store
+                loaded = load_articles([item for item in results if item.ok])
+                filtered_content = [item for item in loaded if item.ok]
+                if len(filtered_content) < len(loaded):
+                    detailed_progress.warning(f"Skipped {len(loaded) - len(filtered_content)} articles whose content "
+                                              "is no longer available; run the search again to include them.")
                 
-                # Show initial status message
-                distillation_status.info(f"Starting distillation process for {len(filtered_content)} articles...")
+                # Distill only one representative of each group of near-duplicate articles
+                filtered_content, skipped_duplicates = deduplicate_articles(filtered_content)
+                if skipped_duplicates:
+                    detailed_progress.info(f"Skipped {skipped_duplicates} near-duplicate articles "
+                                           f"({skipped_duplicates} LLM calls saved)")
                 
-                # Initialize distilled articles in session state
-                st.session_state.distilled_articles = []
+                # Show initial status message
+                distillation_status.info(f"Starting distillation process for {len(filtered_content)} articles "
+                                         f"({max_in_flight} at a time)...")
                 
-                # Process each article individually
+                # Process articles concurrently, keeping each result at its rank position
                 progress_bar = st.progress(0)
-                
-                # Create placeholders for updates
-                article_progress = st.empty()
-                article_details = st.empty()
                 processing_status = st.empty()
-                completion_status = st.empty()
+                processing_status.warning("⏳ Extracting key information with OpenAI o1 model...")
                 
-                for i, article in enumerate(filtered_content):
-                    # Update the status message with current article
-                    current_article_title = article['url'].split('/')[-1] if '/' in article['url'] else article['url']
-                    article_progress.info(f"Distilling article {i+1}/{len(filtered_content)}: Processing '{current_article_title}'")
-                    
-                    # Display article details
-                    article_details.markdown(f"""
-                    🔍 **Analyzing**: {article['url']}  
-                    📅 **Published**: {article['publication_date']}  
-                    """)
-                    
-                    # Show processing status
-                    processing_status.warning("⏳ Extracting key information with OpenAI o1 model...")
-                    
-                    # Distill the article
-                    distilled = distill_individual_article(article, user_query)
-                    st.session_state.distilled_articles.append(distilled)
+                distilled_by_rank = [None] * len(filtered_content)
+                completed = 0
+                
+                for i, distilled in distill_articles(filtered_content, user_query, max_workers=max_in_flight):
+                    distilled_by_rank[i] = distilled
+                    completed += 1
                     
                     # Update progress bar
-                    progress_bar.progress((i + 1) / len(filtered_content))
-                    
-                    # Indicate completion of this article
-                    completion_status.success(f"✅ Completed distillation of article {i+1}: {article['url']}")
+                    progress_bar.progress(completed / len(filtered_content))
                     
-                    # Add a visual separator
-                    st.write("---")
-                    
-                    # Ensure UI updates by forcing a small delay
-                    time.sleep(0.1)
+                    # Show the finished distillation as soon as it is available
+                    with detailed_progress:
+                        st.success(f"✅ Completed distillation of article {i+1}: {distilled['url']}")
+                        with st.expander(f"Distilled Content {i+1}: {distilled['url']}"):
+                            st.write(f"**Publication Date:** {distilled['publication_date']}")
+                            if distilled['duplicate_urls']:
+                                st.write(f"**Also published at:** {', '.join(distilled['duplicate_urls'])}")
+                            st.markdown(distilled['distilled_content'])
+                
+                processing_status.empty()
+                
+                # Store references to the distilled articles in rank order; an earlier report is now stale
+                st.session_state.distilled_articles = store_texts(distilled_by_rank, "distilled_content")
+                st.session_state.report_ref = None
                 
                 # Show completion message
                 distillation_status.success(f"Successfully distilled {len(st.session_state.distilled_articles)} articles using OpenAI o1 model.")
@@ -246,7 +435,9 @@ def main():
                     with st.expander(f"Distilled Content {i}: {item['url']}"):
                         st.write(f"**URL:** {item['url']}")
                         st.write(f"**Publication Date:** {item['publication_date']}")
-                        st.markdown(item['distilled_content'])
+                        if item.get('duplicate_urls'):
+                            st.write(f"**Also published at:** {', '.join(item['duplicate_urls'])}")
+                        st.markdown(get_article_store().get(item['distilled_content_ref']) or MISSING_TEXT)
         
         with tab4:
             st.subheader("Generate Analysis Report")
@@ -260,21 +451,34 @@ def main():
                 report_status = st.empty()
                 
                 if st.button("Generate Report"):
-                    with st.spinner("Generating comprehensive report from distilled content..."):
-                        report_status.info("Creating comprehensive analysis report with OpenAI gpt4-turbo model... This may take a moment.")
+                    # Leave out distillations that are no longer in the article store
+                    distilled_articles = load_texts(st.session_state.distilled_articles, "distilled_content")
+                    missing = len(st.session_state.distilled_articles) - len(distilled_articles)
+                    
+                    if not distilled_articles:
+                        report_status.warning("The distilled articles are no longer available; distill the articles again.")
+                    else:
+                        if missing:
+                            st.warning(f"{missing} distilled articles are no longer available and are left out of the report.")
                         
-                        # Generate report using distilled content
-                        report_content = generate_report_from_distilled_content(
-                            st.session_state.distilled_articles, 
-                            analysis_query
-                        )
+                        report_status.info("Creating comprehensive analysis report with OpenAI gpt4-turbo model...")
+                        st.subheader("Generated Report")
+                        
+                        # Render the report as it is generated and keep it for later reruns
+                        report = st.write_stream(stream_report_from_distilled_content(distilled_articles, analysis_query))
+                        st.session_state.report_ref = get_article_store().put(report)
                         
-                        # Display the report in Streamlit
                         report_status.success("Report generated successfully!")
-                        st.subheader("Generated Report")
-                        st.markdown(report_content)
+                
+                # Show the last report, from this mode or from the streaming pipeline, until a new one is generated
+                elif st.session_state.get("report_ref"):
+                    st.subheader("Generated Report")
+                    st.markdown(get_article_store().get(st.session_state.report_ref) or MISSING_TEXT)
             else:
                 st.warning("Please distill the articles first in the 'Distilled Content' tab.")
+    
+    # Render last so the panel includes the stages that ran during this script run
+    show_metrics_panel()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,347 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from data.google_scrape import search_and_extract, HostThrottle, MAX_CONCURRENT_FETCHES, PER_HOST_MIN_INTERVAL
+from data.dedup import deduplicate_articles
+from data.ranking import focus_articles
+from data.clients import get_openai_client
+from data.llm_cache import token_usage
+from data.rate_limit import BATCH
+from data.batch_api import run_chat_batch, BATCH_POLL_INTERVAL
+from app import (distill_articles, generate_report_from_distilled_content, distillation_messages, distilled_article,
+                 MAX_CONCURRENT_DISTILLATIONS, DISTILLATION_MODEL)
+
+# Default number of queries processed at the same time
+MAX_CONCURRENT_QUERIES = 4
+
+# Suffix of the file next to the output that records the submitted batches of an --offline run
+MANIFEST_SUFFIX = ".batches.json"
+
+def read_queries(source):
+    """
+    Read one query per line from a file path or '-' for stdin, skipping blank lines and # comments
+    """
+    stream = sys.stdin if source == "-" else open(source, encoding="utf-8")
+    try:
+        return [line.strip() for line in stream if line.strip() and not line.strip().startswith("#")]
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+def completed_queries(output_path):
+    """
+    Return the (query, recent) pairs already written to the output file with a final status.
+    Queries that found no results are done too; only errors are retried.
+    """
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # Partial line from an interrupted run
+                continue
+            if record.get("status") in ("ok", "no_results"):
+                done.add((record["query"], record["recent"]))
+    return done
+
+class JsonlWriter:
+    """
+    Append records to a JSONL file from several threads, flushing each line immediately
+    """
+    def __init__(self, path):
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def write(self, record):
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+def research(query, recent, fetch_pool, llm_pool, throttle, progress=None, min_usable=None, priority=BATCH):
+    """
+    Run search, extraction, distillation and report generation for one query.
+    progress, if given, is called as progress(stage, details) as the stages advance.
+    With min_usable, extra candidates are fetched until that many usable articles are in.
+    priority is the rate-limit scheduler priority of the OpenAI requests (INTERACTIVE or BATCH).
+    """
+    progress = progress or (lambda stage, details: None)
+    start = time.perf_counter()
+
+    progress("search", {"query": query})
+    results, articles, skipped_duplicates = extract_articles(query, recent, fetch_pool, throttle, min_usable)
+    if not results:
+        return no_results_record(query, recent, start)
+    progress("extracted", {"results": len(results), "usable": len(articles), "skipped_duplicates": skipped_duplicates})
+
+    distilled = [None] * len(articles)
+    for completed, (i, item) in enumerate(distill_articles(articles, query, executor=llm_pool, priority=priority), 1):
+        distilled[i] = item
+        progress("distilled", {"url": item['url'], "completed": completed, "total": len(articles)})
+
+    progress("report", {"sources": len(distilled)})
+    report = generate_report_from_distilled_content(distilled, query, priority) if distilled else ""
+
+    return research_record(query, recent, results, distilled, skipped_duplicates, report, start)
+
+def extract_articles(query, recent, fetch_pool, throttle, min_usable=None):
+    """
+    Search and extract the pages of one query. Returns (results, articles, skipped_duplicates)
+    where articles are the fetched pages, one per group of near-duplicates.
+    """
+    results = search_and_extract(query, recent, throttle=throttle, executor=fetch_pool, min_usable=min_usable)
+
+    # Failed fetches are not worth sending to the LLM
+    articles, skipped_duplicates = deduplicate_articles([item for item in results if item.ok])
+    return results, articles, skipped_duplicates
+
+def no_results_record(query, recent, start):
+    return {"query": query, "recent": recent, "status": "no_results",
+            "elapsed_s": round(time.perf_counter() - start, 2)}
+
+def research_record(query, recent, results, distilled, skipped_duplicates, report, start):
+    """
+    Output record of a researched query
+    """
+    return {
+        "query": query,
+        "recent": recent,
+        "status": "ok",
+        "sources": [
+            {"url": item['url'], "publication_date": item['publication_date'],
+             "duplicate_urls": item['duplicate_urls']}
+            for item in distilled
+        ],
+        "failed_urls": [item.url for item in results if not item.ok],
+        "fetch_errors": dict(Counter(item.error for item in results if not item.ok)),
+        "skipped_duplicates": skipped_duplicates,
+        "distilled": [item['distilled_content'] for item in distilled],
+        "report": report,
+        "elapsed_s": round(time.perf_counter() - start, 2),
+    }
+
+def run_batch(queries, output_path, recent=True, max_queries=MAX_CONCURRENT_QUERIES,
+              max_fetches=MAX_CONCURRENT_FETCHES, max_llm_requests=MAX_CONCURRENT_DISTILLATIONS,
+              per_host_interval=PER_HOST_MIN_INTERVAL, min_usable=None):
+    """
+    Research many queries concurrently, appending one JSONL record per query to output_path.
+
+    Queries already completed in output_path are skipped, so an interrupted run can be resumed
+    by running the same command again. Page fetches and distillation requests share global
+    pools across all queries. Returns a throughput summary.
+    """
+    done = completed_queries(output_path)
+    pending = [query for query in dict.fromkeys(queries) if (query, recent) not in done]
+    print(f"{len(queries)} queries, {len(queries) - len(pending)} already done, {len(pending)} to run", file=sys.stderr)
+
+    writer = JsonlWriter(output_path)
+    throttle = HostThrottle(per_host_interval)
+    usage_before = token_usage.snapshot()
+    start = time.perf_counter()
+    succeeded = 0
+    failed = 0
+
+    with ThreadPoolExecutor(max_workers=max_fetches) as fetch_pool, \
+            ThreadPoolExecutor(max_workers=max_llm_requests) as llm_pool, \
+            ThreadPoolExecutor(max_workers=max_queries) as query_pool:
+        futures = {
+            query_pool.submit(research, query, recent, fetch_pool, llm_pool, throttle, min_usable=min_usable): query
+            for query in pending
+        }
+        for future in as_completed(futures):
+            query = futures[future]
+            try:
+                record = future.result()
+            except Exception as e:
+                record = {"query": query, "recent": recent, "status": "error", "error": f"{type(e).__name__}: {e}"}
+
+            writer.write(record)
+            if record["status"] == "error":
+                failed += 1
+            else:
+                succeeded += 1
+            print(f"[{succeeded + failed}/{len(pending)}] {record['status']}: {query}", file=sys.stderr)
+
+    writer.close()
+    return throughput_summary(len(pending), succeeded, failed, start, usage_before)
+
+def run_offline_batch(queries, output_path, recent=True, max_queries=MAX_CONCURRENT_QUERIES,
+                      max_fetches=MAX_CONCURRENT_FETCHES, max_llm_requests=MAX_CONCURRENT_DISTILLATIONS,
+                      per_host_interval=PER_HOST_MIN_INTERVAL, min_usable=None, poll_interval=BATCH_POLL_INTERVAL):
+    """
+    Like run_batch, but the distillations of all queries go through the OpenAI Batch API.
+
+    Every query is searched and extracted first, then the distillation requests of all queries
+    are submitted as batches and polled until they finish (within 24 hours, at a lower price
+    than synchronous requests), and finally the reports are generated and written. The
+    submitted batches are recorded in output_path + MANIFEST_SUFFIX, so an interrupted run
+    resumes them when the same command is run again; the manifest is removed once every
+    query has been written.
+    """
+    done = completed_queries(output_path)
+    pending = [query for query in dict.fromkeys(queries) if (query, recent) not in done]
+    print(f"{len(queries)} queries, {len(queries) - len(pending)} already done, {len(pending)} to run", file=sys.stderr)
+
+    writer = JsonlWriter(output_path)
+    throttle = HostThrottle(per_host_interval)
+    usage_before = token_usage.snapshot()
+    start = time.perf_counter()
+    succeeded = 0
+    failed = 0
+
+    def finish(record):
+        nonlocal succeeded, failed
+        writer.write(record)
+        if record["status"] == "error":
+            failed += 1
+        else:
+            succeeded += 1
+        print(f"[{succeeded + failed}/{len(pending)}] {record['status']}: {record['query']}", file=sys.stderr)
+
+    # Search and extract every query, keeping only the chunks of each article relevant to its query
+    extracted = {}
+    with ThreadPoolExecutor(max_workers=max_fetches) as fetch_pool, \
+            ThreadPoolExecutor(max_workers=max_queries) as query_pool:
+        futures = {
+            query_pool.submit(extract_articles, query, recent, fetch_pool, throttle, min_usable): query
+            for query in pending
+        }
+        for future in as_completed(futures):
+            query = futures[future]
+            try:
+                results, articles, skipped_duplicates = future.result()
+            except Exception as e:
+                finish({"query": query, "recent": recent, "status": "error", "error": f"{type(e).__name__}: {e}"})
+                continue
+            if not results:
+                finish(no_results_record(query, recent, start))
+                continue
+            extracted[query] = (results, focus_articles(articles, query), skipped_duplicates)
+
+    # Distill the articles of all queries in as few batches as the file limits allow. Request IDs
+    # are derived from query and URL, so a re-run finds the requests in the manifest even if the
+    # pages changed since; a URL listed twice for a query is distilled once
+    extracted = {query: extracted[query] for query in pending if query in extracted}
+    requests = {}
+    labels = {}
+    for query, (_, articles, _) in extracted.items():
+        for article in articles:
+            custom_id = distillation_id(query, article)
+            requests.setdefault(custom_id, (custom_id, DISTILLATION_MODEL, distillation_messages(article, query), {}))
+            labels[custom_id] = {"query": query, "url": article.url}
+    manifest_path = output_path + MANIFEST_SUFFIX
+    contents, errors = run_chat_batch(
+        get_openai_client(), list(requests.values()), poll_interval=poll_interval,
+        manifest_path=manifest_path, labels=labels,
+        progress=lambda batches: print("Batches: " + ", ".join(
+            f"{batch.id} {batch.status}" + (f" {batch.request_counts.completed}/{batch.request_counts.total}"
+                                             if batch.request_counts else "")
+            for batch in batches), file=sys.stderr),
+        description=f"Distillation of {len(requests)} articles for {len(extracted)} queries",
+    )
+
+    def report(query, results, articles, skipped_duplicates):
+        ids = [distillation_id(query, article) for article in articles]
+        distilled = [
+            distilled_article(article, contents[custom_id] if custom_id in contents
+                              else f"Error in distillation: {errors.get(custom_id)}")
+            for article, custom_id in zip(articles, ids)
+        ]
+        report = generate_report_from_distilled_content(distilled, query, BATCH) if distilled else ""
+        return research_record(query, recent, results, distilled, skipped_duplicates, report, start)
+
+    # Generate the reports with the synchronous API, as in run_batch
+    with ThreadPoolExecutor(max_workers=max_llm_requests) as llm_pool:
+        futures = {
+            llm_pool.submit(report, query, *extracted[query]): query
+            for query in extracted
+        }
+        for future in as_completed(futures):
+            try:
+                finish(future.result())
+            except Exception as e:
+                finish({"query": futures[future], "recent": recent, "status": "error", "error": f"{type(e).__name__}: {e}"})
+
+    writer.close()
+
+    # Every query is written now; the distillations of any failed one are in the LLM cache
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
+    return throughput_summary(len(pending), succeeded, failed, start, usage_before)
+
+def distillation_id(query, article):
+    """
+    Batch request ID of an article's distillation for a query, the same in every run
+    """
+    return hashlib.sha256(json.dumps([query, article.url]).encode("utf-8")).hexdigest()[:32]
+
+def throughput_summary(queries, succeeded, failed, start, usage_before):
+    """
+    Queries and tokens per minute since start
+    """
+    elapsed_minutes = max(time.perf_counter() - start, 1e-9) / 60
+    usage_after = token_usage.snapshot()
+    tokens = usage_after["total_tokens"] - usage_before["total_tokens"]
+    return {
+        "queries": queries,
+        "succeeded": succeeded,
+        "failed": failed,
+        "elapsed_s": round(elapsed_minutes * 60, 1),
+        "queries_per_minute": round((succeeded + failed) / elapsed_minutes, 2),
+        "tokens": tokens,
+        "tokens_per_minute": round(tokens / elapsed_minutes, 1),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run many research queries through the pipeline without the UI.")
+    parser.add_argument("queries", help="File with one query per line, or '-' to read from stdin")
+    parser.add_argument("-o", "--output", default="research_results.jsonl",
+                        help="JSONL file results are appended to; completed queries in it are skipped")
+    parser.add_argument("--recent", action="store_true", help="Prioritize recent news")
+    parser.add_argument("--max-queries", type=int, default=MAX_CONCURRENT_QUERIES,
+                        help="Queries processed at the same time")
+    parser.add_argument("--max-fetches", type=int, default=MAX_CONCURRENT_FETCHES,
+                        help="Page downloads in flight across all queries")
+    parser.add_argument("--max-llm-requests", type=int, default=MAX_CONCURRENT_DISTILLATIONS,
+                        help="Distillation requests in flight across all queries")
+    parser.add_argument("--per-host-interval", type=float, default=PER_HOST_MIN_INTERVAL,
+                        help="Minimum seconds between requests to the same host")
+    parser.add_argument("--min-usable", type=int, default=None,
+                        help="Fetch extra candidate URLs and stop once this many usable articles are extracted")
+    parser.add_argument("--offline", action="store_true",
+                        help="Distill through the OpenAI Batch API: cheaper, but results can take up to 24 hours")
+    parser.add_argument("--poll-interval", type=float, default=BATCH_POLL_INTERVAL,
+                        help="Seconds between status checks of submitted batches (with --offline)")
+    args = parser.parse_args(argv)
+
+    options = dict(
+        recent=args.recent,
+        max_queries=args.max_queries,
+        max_fetches=args.max_fetches,
+        max_llm_requests=args.max_llm_requests,
+        per_host_interval=args.per_host_interval,
+        min_usable=args.min_usable,
+    )
+    if args.offline:
+        summary = run_offline_batch(read_queries(args.queries), args.output, poll_interval=args.poll_interval, **options)
+    else:
+        summary = run_batch(read_queries(args.queries), args.output, **options)
+    print(json.dumps(summary, indent=2))
+
+if __name__ == "__main__":
+    main()
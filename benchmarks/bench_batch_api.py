@@ -0,0 +1,67 @@
+import os
+import io
+import sys
+import time
+import argparse
+import tempfile
+import contextlib
+
+# Keep any cache files of the benchmark out of the working tree
+os.environ.setdefault("DEEP_RESEARCH_CACHE_DIR", tempfile.mkdtemp(prefix="deep-research-bench-"))
+
+# Make the data package importable when run as a script
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(parent_dir)
+
+from openai_stub import openai_stub
+from data.articles import Article
+from data.batch_api import run_chat_batch
+
+def make_articles(count):
+    return [
+        Article(f"https://site{i}.example/article", " ".join(f"word{i}-{j}" for j in range(300)), status_code=200)
+        for i in range(count)
+    ]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare synchronous and Batch API distillation against a local OpenAI stub.")
+    parser.add_argument("--articles", type=int, default=40, help="Articles to distill")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent synchronous requests")
+    parser.add_argument("--chat-latency", type=float, default=0.2, help="Seconds per synchronous chat completion")
+    parser.add_argument("--batch-duration", type=float, default=1.0, help="Seconds a batch takes to complete")
+    args = parser.parse_args(argv)
+
+    with openai_stub(chat_latency=args.chat_latency, batch_duration=args.batch_duration) as (base_url, stub):
+        os.environ["OPENAI_BASE_URL"] = base_url
+        os.environ.setdefault("OPENAI_API_KEY", "stub")
+
+        # Imported once the client settings point at the stub
+        from app import distill_articles, distillation_messages, DISTILLATION_MODEL
+        from data.clients import get_openai_client
+
+        query = "benchmark query"
+        articles = make_articles(args.articles)
+
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            distilled = dict(distill_articles(articles, query, max_workers=args.workers, focus=False))
+        sync_seconds = time.perf_counter() - start
+        sync_requests = stub.chat_requests
+
+        # Fresh query so nothing comes from the cache
+        query = "benchmark query, batched"
+        requests = [(str(i), DISTILLATION_MODEL, distillation_messages(article, query), {})
+                    for i, article in enumerate(articles)]
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            results, errors = run_chat_batch(get_openai_client(), requests, poll_interval=0.1)
+        batch_seconds = time.perf_counter() - start
+
+    mapped = sum(1 for i, article in enumerate(articles) if article.url in results.get(str(i), ""))
+    print(f"{'mode':<12} {'seconds':>8} {'chat requests':>14} {'distilled':>10}")
+    print(f"{'synchronous':<12} {sync_seconds:>8.2f} {sync_requests:>14} {len(distilled):>10}")
+    print(f"{'batch':<12} {batch_seconds:>8.2f} {stub.chat_requests - sync_requests:>14} {len(results):>10}")
+    print(f"Batch results mapped back to their article: {mapped}/{len(articles)}, errors: {len(errors)}")
+
+if __name__ == "__main__":
+    main()
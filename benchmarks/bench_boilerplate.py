@@ -0,0 +1,63 @@
+import os
+import sys
+import glob
+import tempfile
+
+# Keep the learned templates of the benchmark out of the working tree
+os.environ.setdefault("DEEP_RESEARCH_CACHE_DIR", tempfile.mkdtemp(prefix="deep-research-bench-"))
+
+# Make the data package importable when run as a script
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(parent_dir)
+
+from data.google_scrape import parse_page
+from data.report import count_tokens
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+# Site chrome wrapped around every article of the simulated site
+SITE_TEMPLATE = """<html><body>
+<div class="cookie-banner"><p>We use cookies and similar technologies to personalise content and ads, to provide
+social media features and to analyse our traffic. By continuing to browse you agree to our use of cookies.</p>
+<p><a href="/privacy">Privacy policy</a> <a href="/cookies">Manage preferences</a></p></div>
+<div class="paywall"><h3>Subscribe to keep reading</h3><p>Get unlimited digital access to award-winning journalism
+for just $1 a week. Cancel anytime.</p></div>
+<article>{article}</article>
+<section class="related"><h2>More from Example News</h2><ul>
+<li><a>Markets rally as inflation cools for a third straight month</a></li>
+<li><a>Inside the race to build the next generation of batteries</a></li>
+<li><a>Opinion: What the new trade deal means for small business</a></li>
+</ul></section>
+<div class="newsletter"><p>Sign up for our morning briefing and get the day's top stories in your inbox.</p></div>
+</body></html>"""
+
+# Number of simulated pages fetched from the site
+PAGES = 12
+
+def article_bodies():
+    """
+    Paragraph groups cut from the fixture pages, used as distinct article bodies
+    """
+    paragraphs = []
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, "*.html"))):
+        with open(path, encoding="utf-8") as f:
+            text = parse_page(f.read())["content"]
+        paragraphs.extend(text[i:i + 600] for i in range(0, len(text), 600))
+    return ["".join(f"<p>{p}</p>" for p in paragraphs[i::PAGES]) for i in range(PAGES)]
+
+def main():
+    print(f"{'page':>4} {'plain chars':>12} {'learned chars':>14} {'tokens saved':>13}")
+    total_plain = total_learned = 0
+    for i, article in enumerate(article_bodies()):
+        html = SITE_TEMPLATE.format(article=article)
+        plain = parse_page(html)["content"]
+        learned = parse_page(html, url=f"https://news.example/story/{i}")["content"]
+        total_plain += count_tokens(plain)
+        total_learned += count_tokens(learned)
+        print(f"{i + 1:>4} {len(plain):>12} {len(learned):>14} {count_tokens(plain) - count_tokens(learned):>13}")
+
+    print(f"Tokens over {PAGES} pages: {total_plain} -> {total_learned} "
+          f"({1 - total_learned / total_plain:.1%} fewer)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+import os
+import re
+import sys
+import glob
+import time
+import random
+
+# Make the data package importable when run as a script
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(parent_dir)
+
+from bs4 import BeautifulSoup
+
+from data.google_scrape import clean_text, CONTENT_CHAR_LIMIT
+from data.html_extract import extract_page
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+# Characters random regression texts are built from, weighted towards whitespace edge cases
+SYNTHETIC_ALPHABET = [" ", " ", "  ", "\n", "\n\n", "\t", "\r", "\xa0", "\x85", "　", "\x1f", "a", "b", "é"]
+
+def clean_text_reference(text):
+    """
+    Original multi-pass clean_text, kept as the reference the rewrite must match exactly
+    """
+    text = re.sub(r'\n+', '\n', text)
+    text = re.sub(r' +', ' ', text)
+    lines = [line.strip() for line in text.split('\n')]
+    lines = [line for line in lines if line]
+    return ' '.join(lines)
+
+def truncate(text):
+    """
+    Truncation applied by format_page
+    """
+    if len(text) > CONTENT_CHAR_LIMIT:
+        return text[:CONTENT_CHAR_LIMIT] + "... [content truncated]"
+    return text
+
+def regression_corpus(synthetic=20000, seed=0):
+    """
+    Raw page texts from both extractors plus short random whitespace-heavy strings
+    """
+    texts = []
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, "*.html"))):
+        with open(path, encoding="utf-8") as f:
+            html = f.read()
+        texts.append(extract_page(html)[0])
+        texts.append(BeautifulSoup(html, "html.parser").get_text())
+
+    rng = random.Random(seed)
+    for _ in range(synthetic):
+        texts.append("".join(rng.choice(SYNTHETIC_ALPHABET) for _ in range(rng.randrange(40))))
+    return texts
+
+def check_identical(texts):
+    """
+    Return the texts on which the rewrite differs from the reference, with and without the limit
+    """
+    mismatches = []
+    for text in texts:
+        expected = clean_text_reference(text)
+        if clean_text(text) != expected or truncate(clean_text(text, limit=CONTENT_CHAR_LIMIT)) != truncate(expected):
+            mismatches.append(text)
+    return mismatches
+
+def ms_per_call(func, texts, repeat=50):
+    func(texts[0])  # Warm up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text in texts:
+            func(text)
+    return (time.perf_counter() - start) / (repeat * len(texts)) * 1000
+
+def main():
+    corpus = regression_corpus()
+    mismatches = check_identical(corpus)
+    print(f"Regression corpus: {len(corpus)} texts, {len(mismatches)} mismatches")
+    for text in mismatches[:5]:
+        print(f"  {text[:80]!r}")
+
+    # Time on the full page texts only
+    pages = corpus[:len(glob.glob(os.path.join(FIXTURES_DIR, "*.html"))) * 2]
+    implementations = [
+        ("reference", clean_text_reference),
+        ("single-pass", clean_text),
+        ("single-pass with limit", lambda text: clean_text(text, limit=CONTENT_CHAR_LIMIT)),
+    ]
+    baseline = None
+    for name, func in implementations:
+        ms = ms_per_call(func, pages)
+        baseline = baseline or ms
+        print(f"  {name:<25} {ms:8.3f} ms/page  {baseline / ms:5.1f}x")
+
+    sys.exit(1 if mismatches else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+import os
+import sys
+import glob
+import time
+
+# Make the data package importable when run as a script
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(parent_dir)
+
+from data.google_scrape import parse_page, parse_page_soup, format_page
+from data.html_extract import extract_page
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+def cpu_time_per_page(func, html, repeat=20):
+    """
+    Return the average CPU time in milliseconds of func(html)
+    """
+    func(html)  # Warm up
+    start = time.process_time()
+    for _ in range(repeat):
+        func(html)
+    return (time.process_time() - start) / repeat * 1000
+
+def main():
+    implementations = [
+        ("beautifulsoup", parse_page_soup),
+        ("single-pass", parse_page),
+        ("single-pass (stdlib parser)", lambda html: format_page(*extract_page(html, use_lxml=False))),
+    ]
+
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, "*.html"))):
+        with open(path, encoding="utf-8") as f:
+            html = f.read()
+
+        print(f"{os.path.basename(path)} ({len(html) / 1024:.1f} KB)")
+        reference = parse_page_soup(html)
+        baseline = None
+        for name, func in implementations:
+            ms = cpu_time_per_page(func, html)
+            baseline = baseline or ms
+            same = "same output" if func(html) == reference else "DIFFERENT OUTPUT"
+            print(f"  {name:<30} {ms:8.2f} ms/page  {baseline / ms:5.1f}x  {same}")
+
+if __name__ == "__main__":
+    main()
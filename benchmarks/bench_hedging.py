@@ -0,0 +1,82 @@
+import os
+import io
+import sys
+import time
+import random
+import argparse
+import tempfile
+import contextlib
+
+# Keep any cache files of the benchmark out of the working tree
+os.environ.setdefault("DEEP_RESEARCH_CACHE_DIR", tempfile.mkdtemp(prefix="deep-research-bench-"))
+
+# Make the data package importable when run as a script
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(parent_dir)
+
+from data import google_scrape
+from data.articles import Article
+from data.google_scrape import fetch_all, fetch_first_k, is_usable, HostThrottle, OVERFETCH_FACTOR, SEARCH_RESULTS
+
+# Simulated page fetches: long-tailed latency, some failures and some paywalled stubs
+FETCH_MEDIAN = 0.3
+FETCH_SIGMA = 1.0
+FAILURE_RATE = 0.15
+PAYWALL_RATE = 0.15
+
+# Requests time out after this many seconds, like the real fetches after 10s
+FETCH_TIMEOUT = 3.0
+
+def simulated_fetch(scale):
+    """
+    Return an extract_content stand-in whose latency and outcome are drawn from a seed per URL,
+    so every mode sees the same page behave the same way
+    """
+    def extract_content(url):
+        rng = random.Random(url)
+        seconds = min(FETCH_MEDIAN * rng.lognormvariate(0, FETCH_SIGMA), FETCH_TIMEOUT) * scale
+        outcome = rng.random()
+        time.sleep(seconds)
+        google_scrape.fetch_latency.observe(seconds)
+        if seconds >= FETCH_TIMEOUT * scale or outcome < FAILURE_RATE:
+            return Article.failed(url, "Timeout", f"Request timed out for {url}", elapsed=seconds)
+        if outcome < FAILURE_RATE + PAYWALL_RATE:
+            return Article(url, "Subscribe to keep reading.", status_code=200, elapsed=seconds)
+        return Article(url, "word " * 400, status_code=200, elapsed=seconds)
+    return extract_content
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare fetching the top results with over-fetching and hedging, with simulated I/O.")
+    parser.add_argument("--queries", type=int, default=20, help="Simulated queries")
+    parser.add_argument("--k", type=int, default=SEARCH_RESULTS, help="Usable articles wanted")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiplier for all simulated latencies")
+    args = parser.parse_args(argv)
+
+    original = google_scrape.extract_content
+    rows = {"top results": [], "all candidates": [], "first k": []}
+    try:
+        for seed in range(args.queries):
+            urls = [f"https://site{i}.example/article-{seed}" for i in range(args.k * OVERFETCH_FACTOR)]
+            for mode, run in [
+                ("top results", lambda: fetch_all(urls[:args.k], throttle=HostThrottle(0))),
+                ("all candidates", lambda: fetch_all(urls, max_workers=len(urls), throttle=HostThrottle(0))),
+                ("first k", lambda: fetch_first_k(urls, args.k, max_workers=len(urls), throttle=HostThrottle(0))),
+            ]:
+                google_scrape.extract_content = simulated_fetch(args.scale)
+                start = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    articles = run()
+                rows[mode].append((time.perf_counter() - start, sum(1 for article in articles if is_usable(article))))
+    finally:
+        google_scrape.extract_content = original
+
+    print(f"{'mode':<15} {'mean s':>7} {'p95 s':>7} {'usable/query':>13} {'queries with k usable':>22}")
+    for mode, results in rows.items():
+        latencies = sorted(seconds for seconds, _ in results)
+        p95 = latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]
+        usable = [count for _, count in results]
+        print(f"{mode:<15} {sum(latencies) / len(latencies):>7.2f} {p95:>7.2f} "
+              f"{sum(usable) / len(usable):>13.2f} {sum(1 for count in usable if count >= args.k):>16}/{len(usable)}")
+
+if __name__ == "__main__":
+    main()
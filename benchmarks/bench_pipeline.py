@@ -0,0 +1,209 @@
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+import tempfile
+import threading
+import contextlib
+import io
+from functools import partial
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+# Keep the page cache of the benchmark runs out of the working tree
+os.environ.setdefault("DEEP_RESEARCH_CACHE_DIR", tempfile.mkdtemp(prefix="deep-research-bench-"))
+
+# Every end-to-end run must search and download its own fresh URLs, not replay the first run's
+os.environ["SEARCH_CACHE"] = "0"
+
+# Make the data package importable when run as a script
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(parent_dir)
+
+from bs4 import BeautifulSoup
+
+from data import google_scrape
+from data.google_scrape import clean_text, extract_date_from_content, extract_content, HostThrottle
+from data.html_extract import extract_page
+from data.dates import parse_date_string
+from bench_dates import DATE_STRINGS
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+# Stored results that later runs are compared against
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baselines.json")
+
+# Number of results returned by the stubbed search backend, as google_search does by default
+STUB_SEARCH_RESULTS = 5
+
+# Change in throughput, relative to the baseline, reported as a regression or improvement
+SIGNIFICANT_CHANGE = 0.10
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+class StubServer(ThreadingHTTPServer):
+    def handle_error(self, request, client_address):
+        # The streaming extractor hangs up once it has enough text; that is expected here
+        if not isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            super().handle_error(request, client_address)
+
+@contextlib.contextmanager
+def stub_server(directory):
+    """
+    Serve a directory over HTTP on a free local port, yielding the base URL
+    """
+    server = StubServer(("127.0.0.1", 0), partial(QuietHandler, directory=directory))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+@contextlib.contextmanager
+def stub_search(urls):
+    """
+    Replace query enhancement and Google search with local stand-ins returning the given URLs
+    """
+    original = google_scrape.enhance_query_with_llm, google_scrape.google_search
+    google_scrape.enhance_query_with_llm = lambda user_query, recent_news=True: user_query
+    google_scrape.google_search = lambda query, num_results=STUB_SEARCH_RESULTS: urls[:num_results]
+    try:
+        yield
+    finally:
+        google_scrape.enhance_query_with_llm, google_scrape.google_search = original
+
+def percentile(sorted_values, fraction):
+    """
+    Nearest-rank percentile of an already sorted list
+    """
+    index = max(0, min(len(sorted_values) - 1, round(fraction * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+def measure(func, inputs, repeat):
+    """
+    Call func on every (argument, size in bytes) input `repeat` times.
+    Returns pages/s, MB/s and p50/p95 latency over all calls.
+    """
+    for argument, _ in inputs:
+        func(argument)  # Warm up
+
+    latencies = []
+    total_bytes = 0
+    for _ in range(repeat):
+        for argument, size in inputs:
+            start = time.perf_counter()
+            func(argument)
+            latencies.append(time.perf_counter() - start)
+            total_bytes += size
+
+    elapsed = sum(latencies)
+    latencies.sort()
+    return {
+        "calls": len(latencies),
+        "pages_per_s": round(len(latencies) / elapsed, 1),
+        "mb_per_s": round(total_bytes / elapsed / 1e6, 2),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+    }
+
+def load_corpus():
+    """
+    Return {file name: html} for the saved pages in the fixtures directory
+    """
+    corpus = {}
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, "*.html"))):
+        with open(path, encoding="utf-8") as f:
+            corpus[os.path.basename(path)] = f.read()
+    return corpus
+
+def run_benchmarks(repeat):
+    corpus = load_corpus()
+    results = {}
+
+    # clean_text on the raw text of each page, before cleaning
+    texts = [extract_page(html)[0] for html in corpus.values()]
+    results["clean_text"] = measure(clean_text, [(text, len(text.encode("utf-8"))) for text in texts], repeat)
+
+    # The single-pass parse extract_content runs: text, boilerplate removal and date candidates
+    pages = [(html, len(html.encode("utf-8"))) for html in corpus.values()]
+    results["extract_page"] = measure(extract_page, pages, repeat)
+
+    # Date strings as found in datetime/content attributes and date elements
+    results["parse_date_string"] = measure(parse_date_string, [(text, len(text.encode("utf-8"))) for text in DATE_STRINGS], repeat)
+
+    # The BeautifulSoup date extractor that extract_page replaced, kept as a reference only
+    soups = [(BeautifulSoup(html, "html.parser"), len(html.encode("utf-8"))) for html in corpus.values()]
+    results["date_from_soup (reference)"] = measure(extract_date_from_content, soups, repeat)
+
+    with stub_server(FIXTURES_DIR) as base_url:
+        run = iter(range(sys.maxsize))
+
+        # A fresh query string per call defeats the page cache, so every call downloads and parses
+        def fetch(name):
+            return extract_content(f"{base_url}/{name}?run={next(run)}")
+
+        pages = [(name, len(html.encode("utf-8"))) for name, html in corpus.items()]
+        results["extract_content"] = measure(fetch, pages, repeat)
+
+        # End to end with the search backend stubbed out and no per-host pacing
+        names = list(corpus)
+        corpus_bytes = sum(len(corpus[names[i % len(names)]].encode("utf-8")) for i in range(STUB_SEARCH_RESULTS))
+
+        def search(query):
+            urls = [f"{base_url}/{names[i % len(names)]}?run={next(run)}" for i in range(STUB_SEARCH_RESULTS)]
+            with stub_search(urls), contextlib.redirect_stdout(io.StringIO()):
+                return google_scrape.search_and_extract(query, throttle=HostThrottle(0))
+
+        end_to_end = measure(search, [("benchmark query", corpus_bytes)], repeat)
+        # One call handles a whole result page, so report pages rather than calls per second
+        end_to_end["pages_per_s"] = round(end_to_end["pages_per_s"] * STUB_SEARCH_RESULTS, 1)
+        results["search_and_extract"] = end_to_end
+
+    return results
+
+def compare(results, baseline):
+    """
+    Print each benchmark next to its baseline, flagging significant throughput changes
+    """
+    print(f"{'benchmark':<28} {'pages/s':>10} {'MB/s':>8} {'p50 ms':>9} {'p95 ms':>9}   vs baseline")
+    for name, result in results.items():
+        line = (f"{name:<28} {result['pages_per_s']:>10} {result['mb_per_s']:>8} "
+                f"{result['p50_ms']:>9} {result['p95_ms']:>9}")
+        base = baseline.get(name)
+        if base:
+            change = result["pages_per_s"] / base["pages_per_s"] - 1
+            verdict = ""
+            if change <= -SIGNIFICANT_CHANGE:
+                verdict = "  REGRESSION"
+            elif change >= SIGNIFICANT_CHANGE:
+                verdict = "  faster"
+            line += f"   {change:+7.1%}{verdict}"
+        print(line)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the scraping and text-processing hot paths offline.")
+    parser.add_argument("--repeat", type=int, default=30, help="Passes over the corpus per benchmark")
+    parser.add_argument("--save", action="store_true", help=f"Store the results as the new baseline in {BASELINE_PATH}")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.repeat)
+
+    baseline = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH, encoding="utf-8") as f:
+            baseline = json.load(f).get("results", {})
+    compare(results, baseline)
+
+    if args.save:
+        with open(BASELINE_PATH, "w", encoding="utf-8") as f:
+            json.dump({"python": sys.version.split()[0], "repeat": args.repeat, "results": results}, f, indent=2)
+            f.write("\n")
+        print(f"Baseline saved to {BASELINE_PATH}")
+
+if __name__ == "__main__":
+    main()
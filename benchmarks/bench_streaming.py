@@ -0,0 +1,108 @@
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+# Keep any cache files of the benchmark out of the working tree
+os.environ.setdefault("DEEP_RESEARCH_CACHE_DIR", tempfile.mkdtemp(prefix="deep-research-bench-"))
+
+# Make the data package importable when run as a script
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(parent_dir)
+
+from data.articles import Article
+from data.pipeline import stream_pipeline, PIPELINE_DISTILL_WORKERS
+from data.google_scrape import HostThrottle, MAX_CONCURRENT_FETCHES
+
+# Simulated latencies in seconds: page downloads have a long tail, LLM calls are slower but steadier
+FETCH_MEDIAN = 0.3
+FETCH_SIGMA = 0.9
+DISTILL_SECONDS = 0.6
+REPORT_SECONDS = 1.0
+
+# Share of the simulated fetches that fail
+FAILURE_RATE = 0.1
+
+def simulated_pages(count, seed):
+    """
+    Return {url: (fetch seconds, failed)} for count simulated search results
+    """
+    rng = random.Random(seed)
+    return {
+        f"https://site{i}.example/article": (FETCH_MEDIAN * rng.lognormvariate(0, FETCH_SIGMA), rng.random() < FAILURE_RATE)
+        for i in range(count)
+    }
+
+def make_fetch(pages, scale):
+    def fetch(url):
+        seconds, failed = pages[url]
+        time.sleep(seconds * scale)
+        if failed:
+            return Article.failed(url, "Timeout", f"Request timed out for {url}")
+        # Distinct words per page so no two pages are near-duplicates
+        return Article(url, " ".join(f"{url}-word{i}" for i in range(300)), status_code=200)
+    return fetch
+
+def make_distill(scale):
+    def distill(article):
+        time.sleep(DISTILL_SECONDS * scale)
+        return {"url": article.url, "publication_date": article.publication_date,
+                "duplicate_urls": list(article.duplicate_urls), "distilled_content": "- fact"}
+    return distill
+
+def run_sequential(urls, fetch, distill, scale, workers):
+    """
+    Stage by stage: every fetch, then every distillation, then the report
+    """
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_FETCHES) as executor:
+        articles = list(executor.map(fetch, urls))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        distilled = list(executor.map(distill, [article for article in articles if article.ok]))
+    report_start = time.perf_counter() - start
+    time.sleep(REPORT_SECONDS * scale)
+    return report_start, time.perf_counter() - start, len(distilled)
+
+def run_streaming(urls, fetch, distill, scale, workers):
+    """
+    Overlapped: distill as pages arrive and start the report at the quorum
+    """
+    start = time.perf_counter()
+    report_start = None
+    report_sources = 0
+    for event, _, payload in stream_pipeline(urls, distill, max_distillations=workers,
+                                             throttle=HostThrottle(0), fetch=fetch):
+        if event == "quorum":
+            report_start = time.perf_counter() - start
+            report_sources = len(payload)
+            time.sleep(REPORT_SECONDS * scale)
+    return report_start, time.perf_counter() - start, report_sources
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare stage-by-stage and overlapped pipeline latency with simulated I/O.")
+    parser.add_argument("--results", type=int, default=10, help="Simulated search results per query")
+    parser.add_argument("--queries", type=int, default=5, help="Simulated queries (different latency draws)")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiplier for all simulated latencies")
+    parser.add_argument("--workers", type=int, default=PIPELINE_DISTILL_WORKERS, help="Distillation workers")
+    args = parser.parse_args(argv)
+
+    print(f"{'query':>5} {'mode':<11} {'report starts':>14} {'end to end':>11} {'sources in report':>18}")
+    totals = {"sequential": 0.0, "streaming": 0.0}
+    for seed in range(args.queries):
+        pages = simulated_pages(args.results, seed)
+        urls = list(pages)
+        fetch = make_fetch(pages, args.scale)
+        distill = make_distill(args.scale)
+        for mode, run in [("sequential", run_sequential), ("streaming", run_streaming)]:
+            report_start, total, sources = run(urls, fetch, distill, args.scale, args.workers)
+            totals[mode] += total
+            print(f"{seed + 1:>5} {mode:<11} {report_start:>13.2f}s {total:>10.2f}s {sources:>18}")
+
+    print(f"Mean end to end: {totals['sequential'] / args.queries:.2f}s sequential, "
+          f"{totals['streaming'] / args.queries:.2f}s streaming")
+
+if __name__ == "__main__":
+    main()
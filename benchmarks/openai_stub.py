@@ -0,0 +1,187 @@
+import re
+import sys
+import json
+import time
+import uuid
+import email
+import argparse
+import threading
+import contextlib
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Seconds a synchronous chat completion takes
+CHAT_LATENCY = 0.2
+
+# Seconds a batch spends in progress before it completes
+BATCH_DURATION = 1.0
+
+SOURCE_URL_PATTERN = re.compile(r"SOURCE URL: (\S+)")
+
+def stub_completion(body):
+    """
+    Deterministic answer to a chat completion request: it names the source URL found in the
+    prompt (or echoes the start of the last message), so callers can check results are mapped
+    back to the right request
+    """
+    prompt = body["messages"][-1]["content"]
+    match = SOURCE_URL_PATTERN.search(prompt)
+    content = f"- Distilled facts from {match.group(1)}" if match else f"- Answer to: {prompt.strip()[:60]}"
+    prompt_tokens = sum(len(message["content"]) for message in body["messages"]) // 4
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body["model"],
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": 20, "total_tokens": prompt_tokens + 20},
+    }
+
+class OpenAIStub:
+    """
+    In-memory stand-in for the OpenAI chat completion, Files and Batch endpoints.
+
+    Batches move from validating to in_progress to completed over batch_duration seconds.
+    Every fail_every-th request of a batch (0 for none) goes to the error file with a 500.
+    """
+    def __init__(self, chat_latency=CHAT_LATENCY, batch_duration=BATCH_DURATION, fail_every=0):
+        self.chat_latency = chat_latency
+        self.batch_duration = batch_duration
+        self.fail_every = fail_every
+        self.files = {}
+        self.batches = {}
+        self.chat_requests = 0
+        self.lock = threading.Lock()
+
+    def create_file(self, content, purpose):
+        file_id = f"file-{uuid.uuid4().hex[:12]}"
+        self.files[file_id] = content
+        return {"id": file_id, "object": "file", "bytes": len(content), "created_at": int(time.time()),
+                "filename": "requests.jsonl", "purpose": purpose, "status": "processed"}
+
+    def create_batch(self, body):
+        batch_id = f"batch_{uuid.uuid4().hex[:12]}"
+        lines = self.files[body["input_file_id"]].decode("utf-8").splitlines()
+        self.batches[batch_id] = {
+            "id": batch_id,
+            "object": "batch",
+            "endpoint": body["endpoint"],
+            "input_file_id": body["input_file_id"],
+            "completion_window": body["completion_window"],
+            "status": "validating",
+            "created_at": int(time.time()),
+            "output_file_id": None,
+            "error_file_id": None,
+            "errors": None,
+            "metadata": body.get("metadata"),
+            "request_counts": {"total": len(lines), "completed": 0, "failed": 0},
+        }
+        threading.Thread(target=self._process, args=(batch_id, lines), daemon=True).start()
+        return self.batches[batch_id]
+
+    def _process(self, batch_id, lines):
+        time.sleep(self.batch_duration / 4)
+        self.batches[batch_id]["status"] = "in_progress"
+        time.sleep(self.batch_duration * 3 / 4)
+
+        output, errors = [], []
+        for i, line in enumerate(lines, 1):
+            request = json.loads(line)
+            if self.fail_every and i % self.fail_every == 0:
+                errors.append({"id": f"req_{i}", "custom_id": request["custom_id"],
+                               "response": {"status_code": 500, "body": {"error": {"message": "Stub server error"}}},
+                               "error": None})
+            else:
+                output.append({"id": f"req_{i}", "custom_id": request["custom_id"],
+                               "response": {"status_code": 200, "request_id": f"req_{i}", "body": stub_completion(request["body"])},
+                               "error": None})
+
+        batch = self.batches[batch_id]
+        if output:
+            batch["output_file_id"] = self.create_file("".join(json.dumps(r) + "\n" for r in output).encode(), "batch_output")["id"]
+        if errors:
+            batch["error_file_id"] = self.create_file("".join(json.dumps(r) + "\n" for r in errors).encode(), "batch_output")["id"]
+        batch["request_counts"] = {"total": len(lines), "completed": len(output), "failed": len(errors)}
+        batch["status"] = "completed"
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def stub(self):
+        return self.server.stub
+
+    def _send(self, payload, status=200, content_type="application/json"):
+        data = payload if isinstance(payload, bytes) else json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _body(self):
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def do_POST(self):
+        path = self.path.split("?")[0]
+        if path == "/v1/chat/completions":
+            body = json.loads(self._body())
+            with self.stub.lock:
+                self.stub.chat_requests += 1
+            time.sleep(self.stub.chat_latency)
+            self._send(stub_completion(body))
+        elif path == "/v1/files":
+            message = email.message_from_bytes(
+                f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode() + self._body())
+            fields = {part.get_param("name", header="content-disposition"): part.get_payload(decode=True)
+                      for part in message.get_payload()}
+            self._send(self.stub.create_file(fields["file"], fields["purpose"].decode()))
+        elif path == "/v1/batches":
+            self._send(self.stub.create_batch(json.loads(self._body())))
+        else:
+            self._send({"error": {"message": f"Unknown path {path}"}}, status=404)
+
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        parts = path.strip("/").split("/")
+        if path == "/v1/batches":
+            batches = sorted(self.stub.batches.values(), key=lambda batch: batch["created_at"], reverse=True)
+            self._send({"object": "list", "data": batches, "has_more": False})
+        elif parts[:2] == ["v1", "batches"] and len(parts) == 3 and parts[2] in self.stub.batches:
+            self._send(self.stub.batches[parts[2]])
+        elif parts[:2] == ["v1", "files"] and len(parts) == 4 and parts[3] == "content" and parts[2] in self.stub.files:
+            self._send(self.stub.files[parts[2]], content_type="application/octet-stream")
+        else:
+            self._send({"error": {"message": f"Unknown path {path}"}}, status=404)
+
+@contextlib.contextmanager
+def openai_stub(**options):
+    """
+    Serve an OpenAIStub on a free local port, yielding (base URL for OPENAI_BASE_URL, stub)
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.stub = OpenAIStub(**options)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}/v1", server.stub
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve a local stand-in for the OpenAI chat, Files and Batch APIs.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--batch-duration", type=float, default=BATCH_DURATION, help="Seconds a batch takes to complete")
+    parser.add_argument("--fail-every", type=int, default=0, help="Fail every n-th request of a batch")
+    args = parser.parse_args(argv)
+
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), StubHandler)
+    server.stub = OpenAIStub(batch_duration=args.batch_duration, fail_every=args.fail_every)
+    print(f"Serving on http://127.0.0.1:{args.port}/v1 (set OPENAI_BASE_URL to this)", file=sys.stderr)
+    server.serve_forever()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+import os
+import hashlib
+import tempfile
+import threading
+import zlib
+from collections import OrderedDict
+
+from data.page_cache import CACHE_DIR
+
+# Upper bound for the decompressed size of the texts kept in memory
+ARTICLE_MEMORY_MAX_BYTES = 32 * 1024 * 1024
+
+# Upper bound for the compressed size of the blobs kept on disk
+ARTICLE_DISK_MAX_BYTES = 500 * 1024 * 1024
+
+def content_key(text):
+    """
+    Content address of a text: SHA-256 of its UTF-8 encoding
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+class ArticleStore:
+    """
+    Content-addressed store of article bodies and distillations.
+
+    Texts are stored once per distinct content as zlib-compressed blobs on disk, with an
+    in-memory LRU of recently used texts in front. Identical texts from different sessions
+    share one blob. The least recently written blobs are removed once the directory exceeds
+    max_disk_bytes; get returns None for them.
+    """
+    def __init__(self, directory=None, max_memory_bytes=ARTICLE_MEMORY_MAX_BYTES, max_disk_bytes=ARTICLE_DISK_MAX_BYTES):
+        self.directory = directory or os.path.join(CACHE_DIR, "articles")
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(self.directory, exist_ok=True)
+        self._disk_bytes = sum(entry.stat().st_size for entry in os.scandir(self.directory) if entry.is_file())
+
+    def _path(self, key):
+        return os.path.join(self.directory, key)
+
+    def _remember(self, key, text):
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return
+        self._memory[key] = text
+        self._memory_bytes += len(text)
+        while self._memory_bytes > self.max_memory_bytes and len(self._memory) > 1:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    def put(self, text):
+        """
+        Store a text and return its key
+        """
+        key = content_key(text)
+        path = self._path(key)
+        with self._lock:
+            self._remember(key, text)
+            if os.path.exists(path):
+                # Mark the blob as recently used so it is pruned last
+                os.utime(path)
+                return key
+
+            # Write to a temporary file first so readers never see a partial blob
+            compressed = zlib.compress(text.encode("utf-8"))
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(compressed)
+            os.replace(tmp_path, path)
+            self._disk_bytes += len(compressed)
+            if self._disk_bytes > self.max_disk_bytes:
+                self._prune()
+        return key
+
+    def get(self, key):
+        """
+        Return the text stored under a key, or None if it is not (or no longer) stored
+        """
+        with self._lock:
+            text = self._memory.get(key)
+            if text is not None:
+                self._memory.move_to_end(key)
+                return text
+
+        try:
+            with open(self._path(key), "rb") as f:
+                text = zlib.decompress(f.read()).decode("utf-8")
+        except (FileNotFoundError, zlib.error):
+            return None
+
+        with self._lock:
+            self._remember(key, text)
+        return text
+
+    def _prune(self):
+        """
+        Remove the least recently written blobs until the directory is 10% under max_disk_bytes
+        """
+        entries = sorted(
+            (entry for entry in os.scandir(self.directory) if entry.is_file() and not entry.name.endswith(".tmp")),
+            key=lambda entry: entry.stat().st_mtime
+        )
+        for entry in entries:
+            if self._disk_bytes <= self.max_disk_bytes * 0.9:
+                break
+            size = entry.stat().st_size
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                continue
+            self._disk_bytes -= size
+
+    def stats(self):
+        with self._lock:
+            return {
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "disk_bytes": self._disk_bytes,
+            }
+
+_article_store = None
+_article_store_lock = threading.Lock()
+
+def get_article_store():
+    """
+    Return the process-wide article store, creating it on first use
+    """
+    global _article_store
+    with _article_store_lock:
+        if _article_store is None:
+            _article_store = ArticleStore()
+        return _article_store
+
+def store_texts(items, field):
+    """
+    Replace items[field] by a reference: return copies of the dicts with the text moved to
+    the store, and `<field>_ref` (its key) and `<field>_chars` (its length) in its place
+    """
+    store = get_article_store()
+    references = []
+    for item in items:
+        reference = {name: value for name, value in item.items() if name != field}
+        reference[f"{field}_ref"] = store.put(item[field])
+        reference[f"{field}_chars"] = len(item[field])
+        references.append(reference)
+    return references
+
+def load_texts(references, field):
+    """
+    Inverse of store_texts: return copies of the dicts with the text loaded back into field.
+    Items whose text has been evicted from the store are left out
+    """
+    store = get_article_store()
+    items = []
+    for reference in references:
+        text = store.get(reference[f"{field}_ref"])
+        if text is None:
+            continue
+        item = {name: value for name, value in reference.items()
+                if name not in (f"{field}_ref", f"{field}_chars")}
+        item[field] = text
+        items.append(item)
+    return items
+
+def store_articles(articles):
+    """
+    Return copies of the articles with their content moved to the store (content_ref set)
+    """
+    store = get_article_store()
+    return [article.replace(content=None, content_ref=store.put(article.content)) if article.ok else article
+            for article in articles]
+
+def load_articles(articles):
+    """
+    Inverse of store_articles: return copies of the articles with their content loaded back.
+    Articles whose content has been evicted from the store come back failed with error "Missing"
+    """
+    store = get_article_store()
+    loaded = []
+    for article in articles:
+        if article.content_ref is None:
+            loaded.append(article)
+            continue
+        text = store.get(article.content_ref)
+        if text is None:
+            loaded.append(article.replace(content="", content_ref=None, error="Missing",
+                                          message="The content is no longer in the article store"))
+        else:
+            loaded.append(article.replace(content=text, content_ref=None))
+    return loaded
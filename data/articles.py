@@ -0,0 +1,53 @@
+class Article:
+    """
+    A fetched search result: the extracted content or why it could not be fetched.
+
+    status_code is the HTTP status (None if no response was received), error the error
+    class of a failed fetch ("HTTP403", "Timeout", "UnsupportedContentType", ...) and
+    message its human-readable description. size is the number of body bytes downloaded
+    and elapsed the fetch time in seconds. content_ref is set instead of content while
+    the text is held in the article store.
+    """
+    __slots__ = ("url", "content", "publication_date", "status_code", "error", "message",
+                 "size", "elapsed", "from_cache", "duplicate_urls", "content_ref")
+
+    def __init__(self, url, content="", publication_date="Unknown", status_code=None, error=None, message=None,
+                 size=0, elapsed=0.0, from_cache=False, duplicate_urls=(), content_ref=None):
+        self.url = url
+        self.content = content
+        self.publication_date = publication_date
+        self.status_code = status_code
+        self.error = error
+        self.message = message
+        self.size = size
+        self.elapsed = elapsed
+        self.from_cache = from_cache
+        self.duplicate_urls = list(duplicate_urls)
+        self.content_ref = content_ref
+
+    @classmethod
+    def failed(cls, url, error, message, status_code=None, elapsed=0.0):
+        return cls(url, status_code=status_code, error=error, message=message, elapsed=elapsed)
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    @property
+    def forbidden(self):
+        return self.status_code == 403
+
+    def replace(self, **changes):
+        """
+        Return a copy with some fields changed
+        """
+        fields = {name: getattr(self, name) for name in self.__slots__}
+        fields.update(changes)
+        return Article(**fields)
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self):
+        state = "ok" if self.ok else self.error
+        return f"Article({self.url!r}, {state}, {len(self.content or '')} chars)"
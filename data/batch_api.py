@@ -0,0 +1,222 @@
+import os
+import json
+import time
+from collections import Counter
+from types import SimpleNamespace
+
+from data.llm_cache import get_llm_cache, request_key, token_usage
+from data.rate_limit import BATCH, call_with_retries
+
+# Endpoint every batched request is sent to
+BATCH_ENDPOINT = "/v1/chat/completions"
+
+# Time within which OpenAI completes a batch, at a lower price than synchronous requests
+BATCH_COMPLETION_WINDOW = "24h"
+
+# Limits of one batch input file (the API allows 50,000 requests and 200 MB)
+BATCH_MAX_REQUESTS = 50000
+BATCH_MAX_BYTES = 190 * 1024 * 1024
+
+# Seconds between two status checks of submitted batches
+BATCH_POLL_INTERVAL = 30.0
+
+# Batch statuses that no longer change
+FINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+# Final statuses of batches that will return no more results; their requests are submitted again
+UNUSABLE_STATUSES = ("failed", "expired", "cancelled")
+
+def _api(request):
+    """
+    Call a Batch or Files API endpoint, retrying transient errors
+    """
+    return call_with_retries(request, "batch-api", 0, priority=BATCH)
+
+def batch_line(custom_id, model, messages, **params):
+    """
+    One line of a batch input file: a chat completion request tagged with custom_id
+    """
+    return json.dumps({
+        "custom_id": custom_id,
+        "method": "POST",
+        "url": BATCH_ENDPOINT,
+        "body": dict(params, model=model, messages=messages),
+    }, ensure_ascii=False)
+
+def pack_batch_files(entries, max_requests=BATCH_MAX_REQUESTS, max_bytes=BATCH_MAX_BYTES):
+    """
+    Split (custom_id, line) entries, in order, into groups that each fit in one input file
+    """
+    files = []
+    current = []
+    size = 0
+    for custom_id, line in entries:
+        line_bytes = len(line.encode("utf-8")) + 1
+        if current and (len(current) == max_requests or size + line_bytes > max_bytes):
+            files.append(current)
+            current = []
+            size = 0
+        current.append((custom_id, line))
+        size += line_bytes
+    if current:
+        files.append(current)
+    return files
+
+def submit_batch(client, content, description=""):
+    """
+    Upload one input file and create a batch for it
+    """
+    input_file = _api(lambda: client.files.create(file=("requests.jsonl", content.encode("utf-8")), purpose="batch"))
+    batch = _api(lambda: client.batches.create(
+        input_file_id=input_file.id,
+        endpoint=BATCH_ENDPOINT,
+        completion_window=BATCH_COMPLETION_WINDOW,
+        metadata={"description": description[:500]},
+    ))
+    print(f"Submitted batch {batch.id} with {content.count(chr(10))} requests")
+    return batch
+
+def load_manifest(path):
+    """
+    Read a batch manifest, or return an empty one if there is none
+    """
+    if not path or not os.path.exists(path):
+        return {"batches": [], "requests": {}}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def save_manifest(path, manifest):
+    """
+    Write a batch manifest, replacing the previous one only once the new one is complete
+    """
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+def wait_for_batches(client, batches, poll_interval=BATCH_POLL_INTERVAL, progress=None):
+    """
+    Poll until every batch has reached a final status, returning the final batch objects.
+    progress, if given, is called with the list of current batch objects after each poll.
+    """
+    current = {batch.id: batch for batch in batches}
+    while True:
+        for batch_id, batch in current.items():
+            if batch.status not in FINAL_STATUSES:
+                current[batch_id] = _api(lambda: client.batches.retrieve(batch_id))
+        if progress:
+            progress(list(current.values()))
+        if all(batch.status in FINAL_STATUSES for batch in current.values()):
+            return list(current.values())
+        time.sleep(poll_interval)
+
+def _read_file(client, file_id):
+    if not file_id:
+        return []
+    text = _api(lambda: client.files.content(file_id)).text
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+def read_batch_results(client, batch):
+    """
+    Return ({custom_id: content}, {custom_id: error message}, batch error) for a finished batch.
+    The batch error describes why a batch that did not complete returned no result for some requests.
+    """
+    results = {}
+    errors = {}
+    for record in _read_file(client, batch.output_file_id) + _read_file(client, batch.error_file_id):
+        custom_id = record["custom_id"]
+        response = record.get("response") or {}
+        body = response.get("body") or {}
+        if response.get("status_code") == 200 and body.get("choices"):
+            results[custom_id] = body["choices"][0]["message"]["content"]
+            token_usage.record(SimpleNamespace(**body["usage"]) if body.get("usage") else None, body.get("model", ""))
+        else:
+            error = record.get("error") or body.get("error") or {}
+            errors[custom_id] = error.get("message") or f"HTTP {response.get('status_code')}"
+
+    batch_error = f"Batch {batch.status}"
+    if batch.errors and batch.errors.data:
+        batch_error += ": " + "; ".join(error.message for error in batch.errors.data if error.message)
+    return results, errors, batch_error
+
+def run_chat_batch(client, requests, poll_interval=BATCH_POLL_INTERVAL, use_cache=True, progress=None, description="",
+                   manifest_path=None, labels=None):
+    """
+    Run chat completion requests through the Batch API and return ({custom_id: content},
+    {custom_id: error message}).
+
+    requests is a list of (custom_id, model, messages, params) with distinct custom_ids.
+    Responses already in the LLM cache are not sent, and new responses are added to it, so a
+    later synchronous run of the same request is free. Requests are split across as many
+    batches as the file limits need.
+
+    With manifest_path, every submitted batch is recorded there (batch ID, input file ID, the
+    custom_ids it holds and labels[custom_id], a description of each request) before polling.
+    A later call with the same manifest collects requests already in a batch that has not
+    failed, expired or been cancelled from that batch instead of submitting them again.
+    """
+    duplicates = [custom_id for custom_id, count in Counter(request[0] for request in requests).items() if count > 1]
+    if duplicates:
+        raise ValueError(f"Duplicate custom_id in batch requests: {', '.join(map(str, duplicates[:5]))}")
+
+    labels = labels or {}
+    cache = get_llm_cache() if use_cache else None
+    cache = cache if cache and cache.enabled else None
+
+    results = {}
+    errors = {}
+    keys = {}
+    entries = []
+    for custom_id, model, messages, params in requests:
+        key = request_key(model, messages, **params)
+        content = cache.get(key) if cache else None
+        if content is not None:
+            results[custom_id] = content
+            continue
+        keys[custom_id] = (key, model)
+        entries.append((custom_id, batch_line(custom_id, model, messages, **params)))
+
+    print(f"{len(requests)} requests: {len(results)} from the cache, {len(entries)} to batch")
+    if not entries:
+        return results, errors
+
+    # Pick up the batches of an interrupted run that still hold some of the requests
+    pending = {custom_id for custom_id, _ in entries}
+    batches = []
+    for record in load_manifest(manifest_path)["batches"]:
+        custom_ids = [custom_id for custom_id in record["custom_ids"] if custom_id in pending]
+        if not custom_ids:
+            continue
+        batch = _api(lambda: client.batches.retrieve(record["id"]))
+        if batch.status in UNUSABLE_STATUSES:
+            continue
+        print(f"Resuming batch {batch.id} ({batch.status}) with {len(custom_ids)} requests")
+        batches.append((batch, custom_ids))
+        pending.difference_update(custom_ids)
+
+    def record_batches():
+        if manifest_path:
+            save_manifest(manifest_path, {
+                "batches": [{"id": batch.id, "input_file_id": batch.input_file_id, "custom_ids": custom_ids}
+                            for batch, custom_ids in batches],
+                "requests": {custom_id: labels.get(custom_id) for _, custom_ids in batches for custom_id in custom_ids},
+            })
+
+    # Submit the remaining requests, recording each batch as soon as it exists
+    record_batches()
+    for file in pack_batch_files([entry for entry in entries if entry[0] in pending]):
+        batches.append((submit_batch(client, "".join(line + "\n" for _, line in file), description),
+                        [custom_id for custom_id, _ in file]))
+        record_batches()
+
+    finished = wait_for_batches(client, [batch for batch, _ in batches], poll_interval, progress)
+    for (_, custom_ids), batch in zip(batches, finished):
+        batch_results, batch_errors, batch_error = read_batch_results(client, batch)
+        for custom_id in custom_ids:
+            if custom_id in batch_results:
+                results[custom_id] = batch_results[custom_id]
+                if cache:
+                    cache.put(*keys[custom_id], results[custom_id])
+            else:
+                errors[custom_id] = batch_errors.get(custom_id, batch_error)
+    return results, errors
@@ -0,0 +1,169 @@
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+from data.page_cache import CACHE_DIR, normalize_url
+
+# A block is boilerplate for a domain once it has been seen on at least this many distinct pages...
+BOILERPLATE_MIN_PAGES = 3
+
+# ...and on at least this share of the domain's pages seen so far
+BOILERPLATE_MIN_SHARE = 0.5
+
+# Distinct blocks remembered per domain; the rarest, least recently seen ones are forgotten first
+MAX_BLOCKS_PER_DOMAIN = 5000
+
+# Distinct page URLs remembered per domain, so refetching a page does not count it twice
+MAX_PAGES_PER_DOMAIN = 1000
+
+# Set BOILERPLATE_LEARNING=0 to neither learn nor strip per-domain boilerplate
+BOILERPLATE_LEARNING_ENABLED = os.getenv("BOILERPLATE_LEARNING", "1") != "0"
+
+def block_fingerprint(words):
+    """
+    63-bit fingerprint of a text block given as its list of words (fits SQLite integers)
+    """
+    data = " ".join(words).encode("utf-8")
+    return (zlib.crc32(data) << 31) ^ zlib.adler32(data)
+
+class BoilerplateStore:
+    """
+    Persistent per-domain templates of recurring text blocks, backed by SQLite.
+
+    For every newly seen page of a domain, the fingerprints of its text blocks are counted.
+    Blocks that recur on enough of a domain's pages (cookie banners, subscription prompts,
+    related-article lists, ...) form its template and are stripped from later pages.
+    """
+    def __init__(self, path=None, min_pages=BOILERPLATE_MIN_PAGES, min_share=BOILERPLATE_MIN_SHARE,
+                 max_blocks=MAX_BLOCKS_PER_DOMAIN, max_pages=MAX_PAGES_PER_DOMAIN,
+                 enabled=BOILERPLATE_LEARNING_ENABLED):
+        self.path = path or os.path.join(CACHE_DIR, "boilerplate.sqlite")
+        self.min_pages = min_pages
+        self.min_share = min_share
+        self.max_blocks = max_blocks
+        self.max_pages = max_pages
+        self.enabled = enabled
+        self._templates = {}
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS domains (
+                domain TEXT PRIMARY KEY,
+                pages INTEGER
+            );
+            CREATE TABLE IF NOT EXISTS seen_pages (
+                domain TEXT,
+                url TEXT,
+                seen_at REAL,
+                PRIMARY KEY (domain, url)
+            );
+            CREATE TABLE IF NOT EXISTS blocks (
+                domain TEXT,
+                fingerprint INTEGER,
+                pages INTEGER,
+                last_seen REAL,
+                PRIMARY KEY (domain, fingerprint)
+            );
+        """)
+        self._conn.commit()
+
+    def template(self, domain):
+        """
+        Return the fingerprints of the blocks stripped from pages of a domain
+        """
+        if not self.enabled:
+            return frozenset()
+        with self._lock:
+            template = self._templates.get(domain)
+            if template is None:
+                template = self._load_template(domain)
+                self._templates[domain] = template
+            return template
+
+    def _load_template(self, domain):
+        row = self._conn.execute("SELECT pages FROM domains WHERE domain = ?", (domain,)).fetchone()
+        if row is None:
+            return frozenset()
+        threshold = max(self.min_pages, self.min_share * row[0])
+        return frozenset(fingerprint for (fingerprint,) in self._conn.execute(
+            "SELECT fingerprint FROM blocks WHERE domain = ? AND pages >= ?", (domain, threshold)
+        ))
+
+    def observe(self, domain, url, fingerprints):
+        """
+        Count the blocks of a page; pages already observed for the domain are ignored
+        """
+        if not self.enabled or not fingerprints:
+            return
+        key = normalize_url(url)
+        now = time.time()
+        with self._lock:
+            if self._conn.execute("SELECT 1 FROM seen_pages WHERE domain = ? AND url = ?", (domain, key)).fetchone():
+                return
+
+            self._conn.execute("INSERT INTO seen_pages VALUES (?, ?, ?)", (domain, key, now))
+            self._conn.execute(
+                "INSERT INTO domains VALUES (?, 1) ON CONFLICT (domain) DO UPDATE SET pages = pages + 1", (domain,)
+            )
+            self._conn.executemany(
+                "INSERT INTO blocks VALUES (?, ?, 1, ?) "
+                "ON CONFLICT (domain, fingerprint) DO UPDATE SET pages = pages + 1, last_seen = excluded.last_seen",
+                [(domain, fingerprint, now) for fingerprint in set(fingerprints)]
+            )
+            self._prune(domain)
+            self._conn.commit()
+            self._templates[domain] = self._load_template(domain)
+
+    def _prune(self, domain):
+        """
+        Keep at most max_blocks blocks and max_pages page URLs for a domain
+        """
+        self._conn.execute("""
+            DELETE FROM blocks WHERE domain = ? AND fingerprint NOT IN (
+                SELECT fingerprint FROM blocks WHERE domain = ? ORDER BY pages DESC, last_seen DESC LIMIT ?
+            )
+        """, (domain, domain, self.max_blocks))
+        self._conn.execute("""
+            DELETE FROM seen_pages WHERE domain = ? AND url NOT IN (
+                SELECT url FROM seen_pages WHERE domain = ? ORDER BY seen_at DESC LIMIT ?
+            )
+        """, (domain, domain, self.max_pages))
+
+    def stats(self):
+        """
+        Return the number of domains, counted blocks and template blocks
+        """
+        with self._lock:
+            domains, = self._conn.execute("SELECT COUNT(*) FROM domains").fetchone()
+            blocks, = self._conn.execute("SELECT COUNT(*) FROM blocks").fetchone()
+            template_blocks = sum(len(self._load_template(domain)) for (domain,) in
+                                  self._conn.execute("SELECT domain FROM domains").fetchall())
+        return {"domains": domains, "blocks": blocks, "template_blocks": template_blocks}
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM domains")
+            self._conn.execute("DELETE FROM seen_pages")
+            self._conn.execute("DELETE FROM blocks")
+            self._conn.commit()
+            self._templates.clear()
+
+_boilerplate_store = None
+_boilerplate_store_lock = threading.Lock()
+
+def get_boilerplate_store():
+    """
+    Return the process-wide boilerplate template store, creating it on first use
+    """
+    global _boilerplate_store
+    with _boilerplate_store_lock:
+        if _boilerplate_store is None:
+            _boilerplate_store = BoilerplateStore()
+        return _boilerplate_store
@@ -0,0 +1,57 @@
+import importlib.util
+import threading
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from openai import OpenAI
+
+# Connection pool sizes for page downloads
+HTTP_POOL_CONNECTIONS = 20
+HTTP_POOL_MAXSIZE = 20
+
+# Connection limits and timeouts for the OpenAI API
+OPENAI_MAX_CONNECTIONS = 20
+OPENAI_MAX_KEEPALIVE_CONNECTIONS = 10
+OPENAI_CONNECT_TIMEOUT = 10.0
+OPENAI_READ_TIMEOUT = 600.0
+
+# HTTP/2 is used for the OpenAI API when the optional h2 package is installed
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+_lock = threading.Lock()
+_http_session = None
+_openai_client = None
+
+def get_http_session():
+    """
+    Return the shared keep-alive requests session used for page downloads
+    """
+    global _http_session
+    with _lock:
+        if _http_session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=HTTP_POOL_CONNECTIONS, pool_maxsize=HTTP_POOL_MAXSIZE)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _http_session = session
+        return _http_session
+
+def get_openai_client():
+    """
+    Return the shared OpenAI client, backed by a pooled (HTTP/2 where available) httpx client
+    """
+    global _openai_client
+    with _lock:
+        if _openai_client is None:
+            http_client = httpx.Client(
+                http2=HTTP2_AVAILABLE,
+                limits=httpx.Limits(
+                    max_connections=OPENAI_MAX_CONNECTIONS,
+                    max_keepalive_connections=OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+                ),
+                timeout=httpx.Timeout(OPENAI_READ_TIMEOUT, connect=OPENAI_CONNECT_TIMEOUT),
+            )
+            # Retries are left to the rate-limit scheduler (data/rate_limit.py), which paces them per model
+            _openai_client = OpenAI(http_client=http_client, max_retries=0)
+        return _openai_client
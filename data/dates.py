@@ -0,0 +1,163 @@
+import re
+import json
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlparse
+
+# Fallback strptime formats, applied to the first 19 characters of a candidate
+DATE_FORMATS = ['%Y-%m-%dT%H:%M:%S', '%Y-%m-%d', '%B %d, %Y', '%Y/%m/%d']
+
+# ISO 8601 date or timestamp, with optional fractional seconds and UTC offset
+ISO_DATE_PATTERN = re.compile(
+    r'(\d{4})-(\d{2})-(\d{2})'
+    r'(?:[T ](\d{2}):(\d{2})(?::(\d{2})(?:[.,]\d+)?)?\s*(Z|[+-]\d{2}(?::?\d{2})?)?)?'
+)
+
+# "January 5, 2023", "Jan. 5 2023" and "5 January 2023"
+MONTH_FIRST_PATTERN = re.compile(r'([A-Za-z]{3,9})\.? (\d{1,2}),? (\d{4})')
+DAY_FIRST_PATTERN = re.compile(r'(\d{1,2}) ([A-Za-z]{3,9})\.?,? (\d{4})')
+
+MONTHS = {
+    name: number
+    for number, names in enumerate([
+        ("january", "jan"), ("february", "feb"), ("march", "mar"), ("april", "apr"),
+        ("may",), ("june", "jun"), ("july", "jul"), ("august", "aug"),
+        ("september", "sep", "sept"), ("october", "oct"), ("november", "nov"), ("december", "dec"),
+    ], 1)
+    for name in names
+}
+
+# <meta> attributes that carry the publication date in their content attribute
+PUBLISHED_META = frozenset([
+    ("property", "article:published_time"),
+    ("property", "og:published_time"),
+    ("itemprop", "datepublished"),
+    ("name", "article:published_time"),
+    ("name", "pubdate"),
+    ("name", "publishdate"),
+    ("name", "publish-date"),
+    ("name", "date"),
+    ("name", "dc.date"),
+    ("name", "dc.date.issued"),
+    ("name", "dcterms.created"),
+    ("name", "parsely-pub-date"),
+    ("name", "sailthru.date"),
+])
+
+# Maximum nesting of JSON-LD objects searched for datePublished
+JSONLD_MAX_DEPTH = 6
+
+# Number of domains whose winning date selector is remembered
+MAX_LEARNED_DOMAINS = 5000
+
+def _timezone(offset):
+    if offset is None:
+        return None
+    if offset == "Z":
+        return timezone.utc
+    sign = -1 if offset[0] == "-" else 1
+    digits = offset[1:].replace(":", "")
+    minutes = int(digits[:2]) * 60 + int(digits[2:4] or 0)
+    return timezone(sign * timedelta(minutes=minutes))
+
+def parse_date_string(date_str):
+    """
+    Parse a date candidate, returning a datetime or None.
+
+    ISO 8601 timestamps (including UTC offsets, which are kept as tzinfo) and dates with
+    month names are parsed directly; anything else falls back to the strptime formats.
+    """
+    date_str = date_str.strip()
+    try:
+        match = ISO_DATE_PATTERN.fullmatch(date_str)
+        if match:
+            year, month, day, hour, minute, second, offset = match.groups()
+            return datetime(int(year), int(month), int(day), int(hour or 0), int(minute or 0),
+                            int(second or 0), tzinfo=_timezone(offset))
+
+        match = MONTH_FIRST_PATTERN.fullmatch(date_str)
+        if match and match.group(1).lower() in MONTHS:
+            return datetime(int(match.group(3)), MONTHS[match.group(1).lower()], int(match.group(2)))
+
+        match = DAY_FIRST_PATTERN.fullmatch(date_str)
+        if match and match.group(2).lower() in MONTHS:
+            return datetime(int(match.group(3)), MONTHS[match.group(2).lower()], int(match.group(1)))
+    except ValueError:
+        # Out-of-range fields such as month 13
+        return None
+
+    date_str = date_str[:19]
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(date_str, fmt)
+        except ValueError:
+            continue
+    return None
+
+def find_jsonld_date(text):
+    """
+    Return the first datePublished string in a JSON-LD block, or None
+    """
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return None
+
+    stack = [(data, 0)]
+    while stack:
+        node, depth = stack.pop(0)
+        if isinstance(node, dict):
+            value = node.get("datePublished")
+            if isinstance(value, str) and value:
+                return value
+            children = node.values()
+        elif isinstance(node, list):
+            children = node
+        else:
+            continue
+        if depth < JSONLD_MAX_DEPTH:
+            stack.extend((child, depth + 1) for child in children if isinstance(child, (dict, list)))
+    return None
+
+def domain_of(url):
+    """
+    Host name of a URL without a leading www., used as the key of per-domain knowledge
+    """
+    host = urlparse(url).netloc.lower().split("@")[-1].split(":")[0]
+    return host[4:] if host.startswith("www.") else host
+
+class DomainSelectors:
+    """
+    Remembers, per domain, the selector that last produced a valid publication date and
+    its rank, so later pages from the same site try it first. Least recently used domains
+    are forgotten beyond max_domains.
+    """
+    def __init__(self, max_domains=MAX_LEARNED_DOMAINS):
+        self.max_domains = max_domains
+        self._selectors = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, domain):
+        """
+        Return (selector, rank) learned for a domain, or None
+        """
+        with self._lock:
+            learned = self._selectors.get(domain)
+            if learned is not None:
+                self._selectors.move_to_end(domain)
+            return learned
+
+    def learn(self, domain, selector, rank):
+        with self._lock:
+            self._selectors[domain] = (selector, rank)
+            self._selectors.move_to_end(domain)
+            while len(self._selectors) > self.max_domains:
+                self._selectors.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._selectors.clear()
+
+# Process-wide selector memory shared by all extractions
+domain_selectors = DomainSelectors()
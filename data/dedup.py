@@ -0,0 +1,136 @@
+import hashlib
+import random
+import re
+from collections import defaultdict
+
+# Number of words per shingle
+SHINGLE_SIZE = 5
+
+# Number of MinHash permutations, split into LSH bands of BAND_ROWS rows
+NUM_PERMUTATIONS = 128
+BAND_ROWS = 4
+
+# Estimated Jaccard similarity above which two articles are considered near-duplicates
+DUPLICATE_THRESHOLD = 0.8
+
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+
+WORD_PATTERN = re.compile(r'\w+')
+
+# Fixed seed so signatures are comparable across runs
+_rng = random.Random(1729)
+PERMUTATIONS = [(_rng.randrange(1, MERSENNE_PRIME), _rng.randrange(0, MERSENNE_PRIME)) for _ in range(NUM_PERMUTATIONS)]
+
+def shingles(text, size=SHINGLE_SIZE):
+    """
+    Set of hashed word n-grams of a text
+    """
+    words = WORD_PATTERN.findall(text.lower())
+    return {
+        int.from_bytes(hashlib.blake2b(" ".join(words[i:i + size]).encode("utf-8"), digest_size=4).digest(), "big")
+        for i in range(len(words) - size + 1)
+    }
+
+def minhash_signature(shingle_set):
+    """
+    MinHash signature of a set of shingle hashes
+    """
+    return [
+        min((a * shingle + b) % MERSENNE_PRIME & MAX_HASH for shingle in shingle_set)
+        for a, b in PERMUTATIONS
+    ]
+
+def estimated_similarity(signature_a, signature_b):
+    """
+    Estimated Jaccard similarity of two MinHash signatures
+    """
+    return sum(1 for x, y in zip(signature_a, signature_b) if x == y) / len(signature_a)
+
+def cluster_near_duplicates(texts, threshold=DUPLICATE_THRESHOLD):
+    """
+    Group near-identical texts, returning clusters of indices in input order.
+
+    Candidate pairs come from locality-sensitive hashing over bands of the MinHash
+    signatures and are confirmed against the estimated similarity. Texts too short
+    to shingle always form their own cluster.
+    """
+    parent = list(range(len(texts)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    signatures = {}
+    for i, text in enumerate(texts):
+        shingle_set = shingles(text)
+        if shingle_set:
+            signatures[i] = minhash_signature(shingle_set)
+
+    buckets = defaultdict(list)
+    for i, signature in signatures.items():
+        for band in range(0, NUM_PERMUTATIONS, BAND_ROWS):
+            buckets[(band, tuple(signature[band:band + BAND_ROWS]))].append(i)
+
+    for members in buckets.values():
+        for x, i in enumerate(members):
+            for j in members[x + 1:]:
+                root_i, root_j = find(i), find(j)
+                if root_i != root_j and estimated_similarity(signatures[i], signatures[j]) >= threshold:
+                    # Keep the lowest index as root so the best-ranked article represents the cluster
+                    parent[max(root_i, root_j)] = min(root_i, root_j)
+
+    clusters = defaultdict(list)
+    for i in range(len(texts)):
+        clusters[find(i)].append(i)
+    return sorted(clusters.values())
+
+def deduplicate_articles(articles, threshold=DUPLICATE_THRESHOLD):
+    """
+    Keep one representative per cluster of near-duplicate articles.
+
+    Returns (representatives, skipped). Each representative is a copy of the best-ranked
+    article of its cluster whose duplicate_urls hold the URLs of the other members, so they
+    can still be cited. skipped is the number of articles left out.
+    """
+    clusters = cluster_near_duplicates([article.content for article in articles], threshold)
+
+    representatives = []
+    for cluster in clusters:
+        representatives.append(articles[cluster[0]].replace(duplicate_urls=[articles[i].url for i in cluster[1:]]))
+
+    return representatives, len(articles) - len(representatives)
+
+class NearDuplicateIndex:
+    """
+    Incremental near-duplicate detection for articles that arrive one at a time.
+
+    The first article of a group to be added represents it; later near-duplicates are
+    reported against it instead of being added. Not thread-safe.
+    """
+    def __init__(self, threshold=DUPLICATE_THRESHOLD):
+        self.threshold = threshold
+        self._signatures = {}
+        self._buckets = defaultdict(list)
+
+    def add(self, key, text):
+        """
+        Return the key of an earlier text this one nearly duplicates, or None after adding it
+        """
+        shingle_set = shingles(text)
+        if not shingle_set:
+            return None
+        signature = minhash_signature(shingle_set)
+        bands = [(band, tuple(signature[band:band + BAND_ROWS])) for band in range(0, NUM_PERMUTATIONS, BAND_ROWS)]
+
+        for bucket in bands:
+            for other in self._buckets.get(bucket, ()):
+                if estimated_similarity(signature, self._signatures[other]) >= self.threshold:
+                    return other
+
+        self._signatures[key] = signature
+        for bucket in bands:
+            self._buckets[bucket].append(key)
+        return None
@@ -1,28 +1,94 @@
 import os
+import codecs
 import requests
+from requests.compat import chardet
+from urllib3.exceptions import ReadTimeoutError
 import json
 import re
 from bs4 import BeautifulSoup
 import openai
 import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime, timedelta
+from urllib.parse import urlparse
 from dotenv import load_dotenv
 from googlesearch import search
 from openai import OpenAI
 
+from data.articles import Article
+from data.clients import get_http_session, get_openai_client
+from data.html_extract import extract_page, PageExtractor
+from data.page_cache import get_page_cache
+from data.search_cache import get_search_cache
+from data.llm_cache import cached_chat_completion
+from data.metrics import track_stage, record_error, DOWNLOADED_BYTES, STAGE_SECONDS
+
 # Load environment variables from .env file
 load_dotenv()
 
 # Set API keys
 openai.api_key = os.getenv("OPENAI_API_KEY")
 
+# Maximum number of pages downloaded at the same time
+MAX_CONCURRENT_FETCHES = 5
+
+# Number of Google results fetched by default
+SEARCH_RESULTS = 5
+
+# In adaptive mode, candidate URLs requested per usable article wanted
+OVERFETCH_FACTOR = 2
+
+# Articles with less content than this (paywalls, consent walls, stubs) do not count as usable
+MIN_USABLE_CHARS = 500
+
+# A fetch running longer than this percentile of recent fetch times is a straggler and gets hedged
+HEDGE_PERCENTILE = 0.9
+
+# Straggler threshold in seconds until HEDGE_MIN_SAMPLES fetch times have been observed
+HEDGE_DEFAULT_DELAY = 3.0
+HEDGE_MIN_SAMPLES = 10
+
+# Number of recent fetch times the straggler threshold is computed from
+LATENCY_WINDOW = 200
+
+# Seconds between checks for queued fetches that have started, while none is being timed
+HEDGE_POLL_INTERVAL = 0.05
+
+# Minimum number of seconds between two requests to the same host
+PER_HOST_MIN_INTERVAL = 1.0
+
+# Maximum number of characters of cleaned content kept per page
+CONTENT_CHAR_LIMIT = 10000
+
+# Maximum number of bytes downloaded per page
+MAX_DOWNLOAD_BYTES = 2 * 1024 * 1024
+
+# Size of the chunks read from the response stream
+DOWNLOAD_CHUNK_SIZE = 16 * 1024
+
+# Content types that are downloaded and parsed; anything else is rejected from the headers
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml", "text/plain")
+
+# Bytes at the start of a body searched for a <meta charset> or http-equiv declaration
+CHARSET_SNIFF_BYTES = 1024
+
+# charset in <meta charset="..."> or <meta http-equiv="Content-Type" content="text/html; charset=...">
+META_CHARSET_PATTERN = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([A-Za-z0-9_.:-]+)', re.I)
+
+# Content of a line without its leading and trailing whitespace; empty lines do not match
+LINE_CONTENT_PATTERN = re.compile(r'\S(?:[^\n]*\S)?')
+
+# Run of spaces inside a line, collapsed to a single space
+SPACE_RUN_PATTERN = re.compile(r' {2,}')
 
 
 def enhance_query_with_llm(user_query, recent_news=True):
     """
     Use ChatGPT to enhance the user query into a more effective search prompt
     """
-    client = OpenAI()  # Initialize the client
+    client = get_openai_client()  # Shared, pooled client
     
     recency_instruction = "Include terms that will prioritize recent news articles and content." if recent_news else ""
     
@@ -38,17 +104,19 @@ def enhance_query_with_llm(user_query, recent_news=True):
     
     print("OPENAI Prompt", prompt)
     try:
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant that converts user queries into effective search queries."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=100,
-            temperature=0.3
-        )
+        with track_stage("query_enhancement"):
+            response_content = cached_chat_completion(
+                client,
+                model="gpt-3.5-turbo",
+                messages=[
+                    {"role": "system", "content": "You are a helpful assistant that converts user queries into effective search queries."},
+                    {"role": "user", "content": prompt}
+                ],
+                max_tokens=100,
+                temperature=0.3
+            )
         
-        enhanced_query = response.choices[0].message.content.strip()
+        enhanced_query = response_content.strip()
         print(f"Original query: {user_query}")
         print(f"Enhanced query: {enhanced_query}")
         return enhanced_query
@@ -56,34 +124,35 @@ def enhance_query_with_llm(user_query, recent_news=True):
         print(f"Error in enhancing query: {e}")
         return user_query  # Fallback to original query if enhancement fails
 
-def google_search(query, num_results=5):
+def google_search(query, num_results=SEARCH_RESULTS):
     """
     Perform a Google search using the googlesearch-python library
     """
     try:
-        search_results = list(search(query, num_results=num_results))
+        with track_stage("google_search"):
+            search_results = list(search(query, num_results=num_results))
         return search_results
     except Exception as e:
         print(f"Error in Google search: {e}")
         return []
 
-def clean_text(text):
+def clean_text(text, limit=None):
     """
-    Clean the extracted text by removing excessive whitespace and newlines
+    Clean the extracted text by removing excessive whitespace and newlines.
+    With a limit, stop once the result is longer than limit characters; the text returned
+    is then a prefix of the full result.
     """
-    # Replace multiple newlines with a single newline
-    text = re.sub(r'\n+', '\n', text)
-    
-    # Replace multiple spaces with a single space
-    text = re.sub(r' +', ' ', text)
-    
-    # Remove leading/trailing whitespace from each line
-    lines = [line.strip() for line in text.split('\n')]
+    if limit is None:
+        # Stripped lines neither start nor end with a space, so joining them creates no new space runs
+        return SPACE_RUN_PATTERN.sub(' ', ' '.join(LINE_CONTENT_PATTERN.findall(text)))
     
-    # Remove empty lines
-    lines = [line for line in lines if line]
-    
-    # Join lines with a space instead of newline
+    lines = []
+    length = -1
+    for match in LINE_CONTENT_PATTERN.finditer(text):
+        lines.append(SPACE_RUN_PATTERN.sub(' ', match.group()))
+        length += len(lines[-1]) + 1
+        if length > limit:
+            break
     return ' '.join(lines)
 
 def extract_date_from_content(soup):
@@ -120,84 +189,431 @@ def extract_date_from_content(soup):
     # No date found
     return None
 
-def extract_content(url):
+def format_page(text, pub_date):
+    """
+    Clean and truncate extracted text and format the publication date
+    """
+    # Clean the text, stopping early once it is known to exceed the limit
+    clean_content = clean_text(text, limit=CONTENT_CHAR_LIMIT)
+    
+    # Truncate if too long
+    if len(clean_content) > CONTENT_CHAR_LIMIT:
+        clean_content = clean_content[:CONTENT_CHAR_LIMIT] + "... [content truncated]"
+        
+    return {
+        "content": clean_content,
+        "publication_date": pub_date.strftime("%Y-%m-%d") if pub_date else "Unknown"
+    }
+
+def parse_page(html, url=None):
+    """
+    Extract the cleaned text and publication date from a page's HTML in a single parsing pass
+    """
+    text, pub_date = extract_page(html, url=url)
+    return format_page(text, pub_date)
+
+def parse_page_soup(html):
     """
-    Extract main content from a webpage with improved error handling
+    BeautifulSoup implementation of parse_page, kept as the reference for benchmarks
     """
+    soup = BeautifulSoup(html, 'html.parser')
+    
+    # Try to extract the publication date
+    pub_date = extract_date_from_content(soup)
+    
+    # Remove script, style, and navigational elements
+    for element in soup(["script", "style", "nav", "footer", "header", "aside", "form"]):
+        element.extract()
+    
+    # Get text
+    text = soup.get_text()
+    
+    return format_page(text, pub_date)
+
+def _known_charset(charset):
+    try:
+        return codecs.lookup(charset).name
+    except (LookupError, TypeError):
+        return None
+
+def response_encoding(response, head=b''):
+    """
+    Return the charset of a response: the one declared in the Content-Type header, else a
+    BOM or <meta> declaration in head (the first bytes of the body), else UTF-8 if head
+    decodes as UTF-8. Other undeclared text falls back to windows-1252, the HTML default
+    (requests decodes it as its ISO-8859-1 subset); only responses without any Content-Type
+    have their encoding detected from head, as requests' apparent_encoding does.
+    """
+    content_type = response.headers.get('Content-Type', '')
+    for param in content_type.split(';')[1:]:
+        name, _, value = param.partition('=')
+        if name.strip().lower() == 'charset' and value.strip():
+            charset = _known_charset(value.strip().strip('"\''))
+            if charset:
+                return charset
+            break
+    
+    for bom, charset in ((codecs.BOM_UTF8, 'utf-8-sig'), (codecs.BOM_UTF16_LE, 'utf-16'), (codecs.BOM_UTF16_BE, 'utf-16')):
+        if head.startswith(bom):
+            return charset
+    
+    match = META_CHARSET_PATTERN.search(head[:CHARSET_SNIFF_BYTES])
+    charset = _known_charset(match.group(1).decode('ascii')) if match else None
+    if charset:
+        return charset
+    
+    # The head may end inside a multi-byte character
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(head)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        if content_type:
+            return 'cp1252'
+        return _known_charset(chardet.detect(head).get('encoding')) or 'cp1252'
+
+def _iter_body(response):
+    """
+    iter_content, reporting a read timeout part-way through the body as a timeout
+    (requests wraps it in a ConnectionError)
+    """
+    try:
+        yield from response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE)
+    except requests.exceptions.ConnectionError as e:
+        if isinstance(e.args[0] if e.args else None, ReadTimeoutError):
+            raise requests.exceptions.ReadTimeout(e, request=e.request, response=e.response) from e
+        raise
+
+def stream_page(response, max_bytes=MAX_DOWNLOAD_BYTES):
+    """
+    Decode and parse a streamed response incrementally, stopping once enough text has been
+    gathered or max_bytes have been read. Returns (result, body_bytes).
+    """
+    extractor = PageExtractor(text_limit=CONTENT_CHAR_LIMIT + 1, url=response.url)
+    decoder = None
+    body = []
+    received = 0
+    parse_seconds = 0.0
+    
+    for chunk in _iter_body(response):
+        if received + len(chunk) > max_bytes:
+            chunk = chunk[:max_bytes - received]
+        body.append(chunk)
+        received += len(chunk)
+        
+        # The first chunk (DOWNLOAD_CHUNK_SIZE bytes) covers the head sniffed for the charset
+        if decoder is None:
+            decoder = codecs.getincrementaldecoder(response_encoding(response, chunk))(errors='replace')
+        
+        start = time.perf_counter()
+        extractor.feed(decoder.decode(chunk))
+        parse_seconds += time.perf_counter() - start
+        if extractor.done or received >= max_bytes:
+            break
+    
+    start = time.perf_counter()
+    if decoder is not None:
+        extractor.feed(decoder.decode(b'', final=True))
+    text, pub_date = extractor.close()
+    result = format_page(text, pub_date)
+    parse_seconds += time.perf_counter() - start
+    
+    # Parsing is interleaved with the download, so its time is accumulated separately
+    STAGE_SECONDS.observe(parse_seconds, stage="page_parse")
+    DOWNLOADED_BYTES.inc(received)
+    return result, b''.join(body)
+
+def extract_content(url, use_cache=True, max_bytes=MAX_DOWNLOAD_BYTES):
+    """
+    Extract main content from a webpage with improved error handling, returning an Article.
+    Successful results are cached on disk; stale entries are revalidated with a conditional GET.
+    The body is streamed and parsed incrementally, reading at most max_bytes.
+    """
+    start = time.perf_counter()
+    with track_stage("page_fetch"):
+        article = _fetch_content(url, use_cache, max_bytes)
+    article.elapsed = time.perf_counter() - start
+    # Fast failures (403s, refused connections) would drag the straggler threshold down; timeouts are real latency
+    if not article.from_cache and (article.ok or article.error.endswith("Timeout")):
+        fetch_latency.observe(article.elapsed)
+    return article
+
+def _failed(url, error, message, status_code=None):
+    record_error("page_fetch", error)
+    return Article.failed(url, error, message, status_code=status_code)
+
+def _fetch_content(url, use_cache, max_bytes):
     headers = {
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
     }
     
+    cache = get_page_cache() if use_cache else None
+    try:
+        cached = cache.lookup(url) if cache else None
+    except Exception as e:
+        # A URL the cache cannot normalize, or a cache failure, is a miss; the request reports any URL error
+        print(f"Page cache lookup failed for {url}: {e}")
+        cached = None
+    if cached and cached.fresh:
+        return Article(url, cached.result["content"], cached.result["publication_date"], status_code=200, from_cache=True)
+    if cached:
+        headers.update(cached.validators())
+    
     try:
         # Improved request handling with explicit timeout
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()  # Raise exception for 4XX/5XX status codes
-        
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Try to extract the publication date
-        pub_date = extract_date_from_content(soup)
-        
-        # Remove script, style, and navigational elements
-        for element in soup(["script", "style", "nav", "footer", "header", "aside", "form"]):
-            element.extract()
-        
-        # Get text
-        text = soup.get_text()
-        
-        # Clean the text
-        clean_content = clean_text(text)
-        
-        # Truncate if too long
-        if len(clean_content) > 10000:
-            clean_content = clean_content[:10000] + "... [content truncated]"
+        with get_http_session().get(url, headers=headers, timeout=10, stream=True) as response:
+            # Page unchanged since it was cached: skip download and parsing
+            if cached and response.status_code == 304:
+                try:
+                    result = cache.revalidated(cached)
+                except Exception as e:
+                    print(f"Page cache update failed for {url}: {e}")
+                    result = cached.result
+                return Article(url, result["content"], result["publication_date"], status_code=304, from_cache=True)
+            
+            response.raise_for_status()  # Raise exception for 4XX/5XX status codes
             
-        result = {
-            "content": clean_content,
-            "publication_date": pub_date.strftime("%Y-%m-%d") if pub_date else "Unknown"
-        }
+            # Reject binary and PDF responses before downloading the body
+            content_type = response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+            if content_type and content_type not in HTML_CONTENT_TYPES:
+                return _failed(url, "UnsupportedContentType", f"Unsupported content type {content_type} for {url}",
+                               status_code=response.status_code)
+            
+            result, body = stream_page(response, max_bytes=max_bytes)
+        
+        if cache:
+            try:
+                cache.store(url, body, result,
+                            etag=response.headers.get('ETag'),
+                            last_modified=response.headers.get('Last-Modified'))
+            except Exception as e:
+                # The page was fetched; failing to cache it must not fail the fetch
+                print(f"Page cache store failed for {url}: {e}")
         
-        return result
+        return Article(url, result["content"], result["publication_date"], status_code=response.status_code, size=len(body))
         
-    except requests.exceptions.Timeout:
-        return {"content": f"Error: Request timed out for {url}", "publication_date": "Unknown"}
-    except requests.exceptions.ConnectionError:
-        return {"content": f"Error: Connection error for {url}", "publication_date": "Unknown"}
+    except requests.exceptions.Timeout as e:
+        return _failed(url, type(e).__name__, f"Request timed out for {url}")
+    except requests.exceptions.ConnectionError as e:
+        return _failed(url, type(e).__name__, f"Connection error for {url}")
     except requests.exceptions.HTTPError as e:
-        return {"content": f"Error: HTTP error {e} for {url}", "publication_date": "Unknown"}
+        status_code = e.response.status_code if e.response is not None else None
+        return _failed(url, f"HTTP{status_code}" if status_code else type(e).__name__, f"HTTP error {e} for {url}",
+                       status_code=status_code)
     except requests.exceptions.RequestException as e:
-        return {"content": f"Error: Request exception {e} for {url}", "publication_date": "Unknown"}
+        return _failed(url, type(e).__name__, f"Request exception {e} for {url}")
     except Exception as e:
-        return {"content": f"Error extracting content: {str(e)} for {url}", "publication_date": "Unknown"}
+        return _failed(url, type(e).__name__, f"Error extracting content: {str(e)} for {url}")
+
+class LatencyTracker:
+    """
+    Recent page fetch times, used to decide when a fetch in flight is a straggler
+    """
+    def __init__(self, window=LATENCY_WINDOW):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, fraction, default=HEDGE_DEFAULT_DELAY, min_samples=HEDGE_MIN_SAMPLES):
+        """
+        Return the given percentile of the recent fetch times, or default while there are too few
+        """
+        with self._lock:
+            samples = sorted(self._samples)
+        if len(samples) < min_samples:
+            return default
+        return samples[min(len(samples) - 1, int(fraction * len(samples)))]
+
+# Fetch times of this process, shared by all searches
+fetch_latency = LatencyTracker()
+
+class HostThrottle:
+    """
+    Enforce a minimum interval between requests to the same host, so different
+    domains can be fetched in parallel while each single site is paced politely
+    """
+    def __init__(self, min_interval=PER_HOST_MIN_INTERVAL):
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._next_slot = {}
+
+    def wait(self, url):
+        host = urlparse(url).netloc.lower()
+        
+        # Reserve the next free slot for this host without holding the lock while sleeping
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.min_interval
+        
+        if slot > now:
+            time.sleep(slot - now)
+
+def fetch_all(urls, max_workers=MAX_CONCURRENT_FETCHES, per_host_interval=PER_HOST_MIN_INTERVAL,
+              throttle=None, executor=None):
+    """
+    Extract content from all URLs concurrently, returning results in the order of the input URLs.
+    A shared throttle and executor can be passed to pace hosts and bound concurrency across calls.
+    """
+    throttle = throttle or HostThrottle(per_host_interval)
+    
+    if executor is None:
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            return fetch_all(urls, throttle=throttle, executor=executor)
+    
+    def fetch(i, url):
+        throttle.wait(url)
+        print(f"Processing {i+1}/{len(urls)}: {url}")
+        return extract_content(url)
+    
+    futures = [executor.submit(fetch, i, url) for i, url in enumerate(urls)]
+    # Collect in submission order to keep the original search-rank order
+    return [future.result() for future in futures]
 
-def search_and_extract(user_query, recent_news=True):
+def is_usable(article):
     """
-    Main function that enhances query, searches Google, and extracts content from top results
+    Whether an article was fetched and has enough content to be worth distilling
+    """
+    return article.ok and len(article.content) >= MIN_USABLE_CHARS
+
+def fetch_first_k(urls, k, max_workers=MAX_CONCURRENT_FETCHES, per_host_interval=PER_HOST_MIN_INTERVAL,
+                  throttle=None, executor=None, hedge_delay=None):
+    """
+    Fetch candidate URLs in rank order until k usable articles are extracted, returning the
+    Articles fetched so far in rank order.
+    
+    A failed or unusable fetch starts the next candidate, and so does a fetch still running
+    after hedge_delay (by default the HEDGE_PERCENTILE of recent fetch times): the straggler
+    keeps running and whichever usable article arrives first counts. A fetch is timed from
+    when its request starts, so time spent queued in a shared executor or waiting for the
+    host throttle never makes it a straggler. Once k usable articles are in, fetches still
+    running are abandoned and candidates not yet started are dropped.
     """
+    throttle = throttle or HostThrottle(per_host_interval)
+    if hedge_delay is None:
+        hedge_delay = fetch_latency.percentile(HEDGE_PERCENTILE)
+    own_executor = executor is None
+    if own_executor:
+        executor = ThreadPoolExecutor(max_workers=max(1, max_workers))
+    
+    # Index of each candidate whose request has started -> monotonic start time
+    started = {}
+    
+    def fetch(i, url):
+        throttle.wait(url)
+        started[i] = time.monotonic()
+        print(f"Processing candidate {i+1}/{len(urls)}: {url}")
+        return extract_content(url)
+    
+    candidates = iter(enumerate(urls))
+    running = {}
+    stragglers = set()
+    fetched = {}
+    usable = 0
+    hedged = 0
+    start = time.perf_counter()
+    
+    try:
+        while usable < k:
+            # Keep enough fetches that are not straggling in flight to reach k usable articles
+            while usable + len(running) - len(stragglers) < k and len(running) < max_workers:
+                candidate = next(candidates, None)
+                if candidate is None:
+                    break
+                running[executor.submit(fetch, *candidate)] = candidate[0]
+            if not running:
+                break
+            
+            # Wait for a fetch to finish, or for the oldest started one not yet hedged to become a straggler
+            pending = [(started[i], future) for future, i in running.items() if future not in stragglers and i in started]
+            oldest = min(pending, key=lambda item: item[0]) if pending else None
+            timeout = max(0.0, oldest[0] + hedge_delay - time.monotonic()) if oldest else None
+            queued = len(pending) + len(stragglers) < len(running)
+            if queued:
+                # Queued fetches are not timed yet; look again soon in case one starts
+                timeout = HEDGE_POLL_INTERVAL if timeout is None else min(timeout, HEDGE_POLL_INTERVAL)
+            finished, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not finished:
+                if oldest and oldest[0] + hedge_delay <= time.monotonic():
+                    stragglers.add(oldest[1])
+                    hedged += 1
+                continue
+            
+            for future in finished:
+                i = running.pop(future)
+                stragglers.discard(future)
+                fetched[i] = future.result()
+                usable += is_usable(fetched[i])
+    finally:
+        for future in running:
+            future.cancel()
+        if own_executor:
+            executor.shutdown(wait=False)
+    
+    print(f"Fetched {len(fetched)} of {len(urls)} candidates in {time.perf_counter() - start:.2f}s: "
+          f"{usable} usable, {hedged} stragglers hedged, {len(running)} abandoned")
+    return [fetched[i] for i in sorted(fetched)]
+
+def search_urls(user_query, recent_news=True, num_results=SEARCH_RESULTS, use_cache=True):
+    """
+    Enhance the query with the LLM and return the URLs of the top Google results.
+    A recent search for the same normalized query and recency flag is answered from the
+    search cache without calling the LLM or Google.
+    """
+    cache = get_search_cache() if use_cache else None
+    cache = cache if cache and cache.enabled else None
+    cached = cache.get(user_query, recent_news, num_results) if cache else None
+    if cached is not None:
+        enhanced_query, urls = cached
+        print(f"Search cache hit for {user_query!r} (enhanced query: {enhanced_query})")
+        return urls
+    
     # Enhance the query using LLM
+    start = time.perf_counter()
     enhanced_query = enhance_query_with_llm(user_query, recent_news)
+    print(f"Query enhancement took {time.perf_counter() - start:.2f}s")
     
     # Perform Google search with recency filter
-    urls = google_search(enhanced_query)
+    start = time.perf_counter()
+    urls = google_search(enhanced_query, num_results=num_results)
+    print(f"Google search took {time.perf_counter() - start:.2f}s")
+    
+    # An empty result is usually a failed or throttled search, not worth remembering
+    if cache and urls:
+        cache.put(user_query, recent_news, num_results, enhanced_query, urls)
+    
+    return urls
+
+def search_and_extract(user_query, recent_news=True, max_workers=MAX_CONCURRENT_FETCHES,
+                       per_host_interval=PER_HOST_MIN_INTERVAL, throttle=None, executor=None, min_usable=None):
+    """
+    Main function that enhances query, searches Google, and extracts content from top results.
+    Returns one Article per result in rank order (failed fetches included, with article.ok False),
+    or an empty list if the search found nothing.
+    With min_usable, OVERFETCH_FACTOR times as many candidates are requested and fetching stops
+    as soon as min_usable usable articles are extracted (see fetch_first_k).
+    """
+    if min_usable:
+        urls = search_urls(user_query, recent_news, num_results=min_usable * OVERFETCH_FACTOR)
+        if not urls:
+            return []
+        return fetch_first_k(urls, min_usable, max_workers=max_workers, per_host_interval=per_host_interval,
+                             throttle=throttle, executor=executor)
+    
+    urls = search_urls(user_query, recent_news)
     
     if not urls:
-        return ["No results found for the query."]
+        return []
     
-    # Extract content from each URL
-    results = []
-    for i, url in enumerate(urls):
-        print(f"Processing {i+1}/{len(urls)}: {url}")
-        extracted = extract_content(url)
-        results.append({
-            "url": url,
-            "content": extracted["content"],
-            "publication_date": extracted["publication_date"]
-        })
-        # Add a small delay to avoid overloading servers
-        if i < len(urls) - 1:
-            time.sleep(1)
-    
-    return results
+    # Extract content from all URLs in parallel, pacing requests to the same host
+    start = time.perf_counter()
+    articles = fetch_all(urls, max_workers=max_workers, per_host_interval=per_host_interval,
+                         throttle=throttle, executor=executor)
+    print(f"Fetched {len(urls)} pages in {time.perf_counter() - start:.2f}s")
+    
+    return articles
 
 if __name__ == "__main__":
     # Example usage
@@ -217,5 +633,5 @@ if __name__ == "__main__":
         
     # Save results to a file
     with open('search_results.json', 'w', encoding='utf-8') as f:
-        json.dump(results, f, ensure_ascii=False, indent=2)
+        json.dump([article.to_dict() for article in results], f, ensure_ascii=False, indent=2)
     print(f"\nResults saved to search_results.json")
\ No newline at end of file
@@ -0,0 +1,357 @@
+import re
+from html.parser import HTMLParser
+
+from data.dates import PUBLISHED_META, parse_date_string, find_jsonld_date, domain_of, domain_selectors
+from data.boilerplate import block_fingerprint, get_boilerplate_store
+from data.metrics import BOILERPLATE_CHARS
+
+# lxml's C parser is used when installed; otherwise the standard library parser is used
+try:
+    from lxml import etree
+    PARSER_ERRORS = (etree.ParserError,)
+except ImportError:
+    etree = None
+    PARSER_ERRORS = ()
+
+# Elements whose text is dropped from the extracted content
+BOILERPLATE_TAGS = frozenset(["script", "style", "nav", "footer", "header", "aside", "form"])
+
+# Elements that start and end a text block; learned boilerplate is matched block by block
+BLOCK_TAGS = frozenset([
+    "address", "article", "blockquote", "details", "div", "dl", "figcaption", "figure", "h1", "h2", "h3",
+    "h4", "h5", "h6", "li", "main", "ol", "p", "pre", "section", "summary", "table", "tr", "ul",
+])
+
+# Generic date candidates, in the priority order used by extract_date_from_content
+DATE_CLASSES = frozenset(["date", "published", "pubdate", "timestamp", "article-date", "post-date"])
+DATE_CLASS_PATTERN = re.compile(r'(date|time|publish|post-date)', re.I)
+
+CLASS_MATCH, ITEMPROP_MATCH, PROPERTY_MATCH, TIME_MATCH, CLASS_PATTERN_MATCH = range(5)
+
+# Rank of a date candidate, lower wins: structured metadata (JSON-LD, <meta>, microdata and
+# <time datetime>), then a generic selector learned for the domain, then the generic matches above
+JSONLD_RANK, META_RANK, ATTRIBUTE_RANK, TIME_DATETIME_RANK, LEARNED_RANK, GENERIC_RANK = range(6)
+
+# Selector of JSON-LD blocks
+JSONLD_SELECTOR = "script[type=application/ld+json]"
+
+NO_CANDIDATE = (GENERIC_RANK + CLASS_PATTERN_MATCH + 1, 0)
+
+class ExtractionHandler:
+    """
+    Collects text and the publication date from parser events in a single pass.
+
+    Date candidates are ranked as they start and parsed as soon as they are complete, so
+    candidates that cannot beat the best date found so far are not examined at all.
+    learned is the (selector, rank) that produced the date on earlier pages of the domain.
+    A learned generic selector ranks ahead of the other generic matches but never ahead of
+    structured metadata. The other generic matches are only parsed, at the end, if it does
+    not resolve on the page.
+
+    With track_blocks, the text is also split into blocks at block-level elements and the
+    fingerprint of each block is recorded; blocks whose fingerprint is in template (the
+    domain's learned boilerplate) are dropped from the text as soon as they end.
+
+    Implements the lxml parser target interface (start/end/data/close); the standard
+    library fallback forwards its callbacks to the same methods.
+    """
+    def __init__(self, learned=None, template=frozenset(), track_blocks=False):
+        self.text_parts = []
+        self.text_chars = 0
+        self.template = template
+        self.track_blocks = track_blocks
+        self.block_fingerprints = []
+        self.stripped_chars = 0
+        self._block_start = 0
+        self._block_words = []
+        self._block_chars = 0
+        self._stripped_blocks = []
+        self.learned_selector, learned_rank = learned or (None, None)
+        self.date = None
+        # (selector, rank) of the winning candidate, without the learned-selector boost
+        self.date_selector = None
+        # Generic candidates set aside while the learned selector may still resolve
+        self._deferred = []
+        self._best = NO_CANDIDATE
+        self._sequence = 0
+        # Whether elements without a date attribute can still beat the best date
+        self._learned_generic = learned_rank is not None and learned_rank >= GENERIC_RANK
+        self._skip_depth = 0
+        self._open_candidates = []
+        self._jsonld = None
+
+    def _priorities(self, tag, attrib):
+        priorities = []
+        classes = attrib.get("class")
+        class_list = classes.split() if classes else ()
+        if any(c in DATE_CLASSES for c in class_list):
+            priorities.append(CLASS_MATCH)
+        if attrib.get("itemprop") == "datePublished":
+            priorities.append(ITEMPROP_MATCH)
+        if attrib.get("property") == "article:published_time":
+            priorities.append(PROPERTY_MATCH)
+        if tag == "time":
+            priorities.append(TIME_MATCH)
+        if any(DATE_CLASS_PATTERN.search(c) for c in class_list):
+            priorities.append(CLASS_PATTERN_MATCH)
+        return priorities
+
+    def _classify(self, tag, attrib, has_date_attribute):
+        """
+        Return (selector, rank) of an element, or None if it is not a date candidate
+        """
+        if tag == "meta":
+            if not has_date_attribute:
+                return None
+            for name in ("property", "name", "itemprop"):
+                value = attrib.get(name)
+                if value and (name, value.lower()) in PUBLISHED_META:
+                    return f"meta[{name}={value}]", META_RANK
+
+        priorities = self._priorities(tag, attrib)
+        if not priorities:
+            return None
+
+        if has_date_attribute and ITEMPROP_MATCH in priorities:
+            return "[itemprop=datePublished]", ATTRIBUTE_RANK
+        if has_date_attribute and PROPERTY_MATCH in priorities:
+            return "[property=article:published_time]", ATTRIBUTE_RANK
+        if has_date_attribute and tag == "time" and attrib.get("datetime"):
+            return "time[datetime]", TIME_DATETIME_RANK
+
+        rank = GENERIC_RANK + priorities[0]
+        if priorities[0] in (CLASS_MATCH, CLASS_PATTERN_MATCH):
+            classes = attrib["class"].split()
+            token = next((c for c in classes if c in DATE_CLASSES), None) or \
+                next(c for c in classes if DATE_CLASS_PATTERN.search(c))
+            return f"{tag}.{token}", rank
+        if priorities[0] == ITEMPROP_MATCH:
+            return "[itemprop=datePublished]", rank
+        if priorities[0] == PROPERTY_MATCH:
+            return "[property=article:published_time]", rank
+        return "time", rank
+
+    def _effective_rank(self, selector, rank):
+        return LEARNED_RANK if rank >= GENERIC_RANK and selector == self.learned_selector else rank
+
+    def _resolve(self, selector, rank, sequence, date_str, defer=True):
+        """
+        Parse a complete candidate and keep it if it outranks the best date so far
+        """
+        effective_rank = self._effective_rank(selector, rank)
+        if (effective_rank, sequence) >= self._best or not date_str:
+            return
+        if defer and self._learned_generic and effective_rank >= GENERIC_RANK:
+            self._deferred.append((selector, rank, sequence, date_str))
+            return
+        date = parse_date_string(date_str)
+        if date:
+            self.date = date
+            self.date_selector = (selector, rank)
+            self._best = (effective_rank, sequence)
+
+    def _end_block(self):
+        """
+        Fingerprint the text gathered since the last block boundary, dropping it if it is boilerplate
+        """
+        if self._block_words:
+            fingerprint = block_fingerprint(self._block_words)
+            self.block_fingerprints.append(fingerprint)
+            if fingerprint in self.template:
+                start = self._block_start
+                # Keep a line break in its place so the neighbouring words stay apart
+                self._stripped_blocks.append((start, self.text_parts[start:]))
+                self.text_parts[start:] = ["\n"]
+                self.text_chars -= self._block_chars
+                self.stripped_chars += self._block_chars
+            self._block_words = []
+            self._block_chars = 0
+        self._block_start = len(self.text_parts)
+
+    @property
+    def kept_chars(self):
+        """
+        Text characters that are final: the block still open may yet be stripped as boilerplate
+        """
+        return self.text_chars - self._block_chars
+
+    def restore_stripped(self):
+        """
+        Put the dropped boilerplate blocks back into the text
+        """
+        for start, parts in reversed(self._stripped_blocks):
+            self.text_parts[start:start + 1] = parts
+            self.text_chars += sum(len(word) for part in parts for word in part.split())
+        self._stripped_blocks = []
+        self.stripped_chars = 0
+
+    def start(self, tag, attrib):
+        if self.track_blocks and tag in BLOCK_TAGS:
+            self._end_block()
+        if tag in BOILERPLATE_TAGS:
+            self._skip_depth += 1
+
+        best_rank = self._best[0]
+        if best_rank == JSONLD_RANK or (not attrib and tag != "time"):
+            return
+
+        if tag == "script":
+            if self._effective_rank(JSONLD_SELECTOR, JSONLD_RANK) < best_rank and \
+                    attrib.get("type", "").lower() == "application/ld+json":
+                self._sequence += 1
+                self._jsonld = (self._sequence, [])
+            return
+
+        date_str = attrib.get("datetime") or attrib.get("content")
+        # Without a date attribute only the generic matches and the learned generic selector remain
+        if not date_str and best_rank <= (LEARNED_RANK if self._learned_generic else GENERIC_RANK):
+            return
+
+        candidate = self._classify(tag, attrib, bool(date_str))
+        if candidate is None:
+            return
+        selector, rank = candidate
+        if self._effective_rank(selector, rank) >= best_rank:
+            return
+
+        self._sequence += 1
+        if date_str:
+            self._resolve(selector, rank, self._sequence, date_str)
+        else:
+            # The element's own text is the candidate; collect it until the end tag
+            self._open_candidates.append((tag, selector, rank, self._sequence, []))
+
+    def end(self, tag):
+        if self.track_blocks and tag in BLOCK_TAGS:
+            self._end_block()
+        if tag in BOILERPLATE_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+
+        if tag == "script" and self._jsonld is not None:
+            sequence, buffer = self._jsonld
+            self._jsonld = None
+            self._resolve(JSONLD_SELECTOR, JSONLD_RANK, sequence, find_jsonld_date("".join(buffer)))
+            return
+
+        for i in range(len(self._open_candidates) - 1, -1, -1):
+            if self._open_candidates[i][0] == tag:
+                self._close_candidate(self._open_candidates.pop(i))
+                break
+
+    def data(self, data):
+        if not self._skip_depth:
+            self.text_parts.append(data)
+            words = data.split()
+            chars = sum(map(len, words))
+            self.text_chars += chars
+            if self.track_blocks:
+                self._block_words += words
+                self._block_chars += chars
+        elif self._jsonld is not None:
+            self._jsonld[1].append(data)
+        for candidate in self._open_candidates:
+            candidate[4].append(data)
+
+    def _close_candidate(self, candidate):
+        _, selector, rank, sequence, buffer = candidate
+        self._resolve(selector, rank, sequence, "".join(buffer))
+
+    def close(self):
+        if self.track_blocks:
+            self._end_block()
+        while self._open_candidates:
+            self._close_candidate(self._open_candidates.pop())
+        # The learned selector did not resolve on this page: fall back to the other generic matches
+        for selector, rank, sequence, date_str in self._deferred:
+            self._resolve(selector, rank, sequence, date_str, defer=False)
+        self._deferred = []
+        return self
+
+    def publication_date(self):
+        return self.date
+
+class _StdlibParser(HTMLParser):
+    """
+    Pure-Python fallback that forwards html.parser callbacks to an ExtractionHandler
+    """
+    def __init__(self, handler):
+        super().__init__(convert_charrefs=True)
+        self.handler = handler
+
+    def handle_starttag(self, tag, attrs):
+        self.handler.start(tag, {name: value or "" for name, value in attrs})
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        self.handler.end(tag)
+
+    def handle_endtag(self, tag):
+        self.handler.end(tag)
+
+    def handle_data(self, data):
+        self.handler.data(data)
+
+class PageExtractor:
+    """
+    Incremental single-pass extractor: feed the document in chunks and stop early once
+    enough text has been gathered.
+
+    text_limit is a number of non-whitespace characters; once it is reached the cleaned
+    text is guaranteed to be at least that long, so the rest of the page can be skipped.
+    With a url, the date selector learned for its domain is tried first and updated, and
+    the domain's learned boilerplate blocks are stripped from the text and updated.
+    """
+    def __init__(self, use_lxml=True, text_limit=None, url=None):
+        self.url = url
+        self.domain = domain_of(url) if url else None
+        if self.domain:
+            self.templates = get_boilerplate_store()
+            self.handler = ExtractionHandler(domain_selectors.get(self.domain), self.templates.template(self.domain),
+                                             track_blocks=self.templates.enabled)
+        else:
+            self.templates = None
+            self.handler = ExtractionHandler()
+        self.text_limit = text_limit
+        if use_lxml and etree is not None:
+            self._parser = etree.HTMLParser(target=self.handler)
+        else:
+            self._parser = _StdlibParser(self.handler)
+
+    @property
+    def done(self):
+        return self.text_limit is not None and self.handler.kept_chars >= self.text_limit
+
+    def feed(self, data):
+        self._parser.feed(data)
+
+    def close(self):
+        """
+        Finish parsing and return (text, publication_date)
+        """
+        try:
+            self._parser.close()
+        except PARSER_ERRORS:
+            # lxml fails on close for empty documents
+            pass
+        self.handler.close()
+        if self.domain and self.handler.date_selector:
+            domain_selectors.learn(self.domain, *self.handler.date_selector)
+        if self.templates:
+            # Never strip a page down to nothing; keep it whole if every block matched the template
+            if self.handler.stripped_chars and not self.handler.text_chars:
+                self.handler.restore_stripped()
+            BOILERPLATE_CHARS.inc(self.handler.stripped_chars)
+            self.templates.observe(self.domain, self.url, self.handler.block_fingerprints)
+        return "".join(self.handler.text_parts), self.handler.publication_date()
+
+def extract_page(html, use_lxml=True, url=None):
+    """
+    Parse a page once, returning (text, publication_date).
+
+    The text excludes boilerplate elements, matching the BeautifulSoup-based extraction in
+    data.google_scrape. publication_date is a datetime (timezone-aware when the page gives
+    an offset) or None.
+    """
+    extractor = PageExtractor(use_lxml=use_lxml, url=url)
+    extractor.feed(html)
+    return extractor.close()
@@ -0,0 +1,263 @@
+import os
+import json
+import hashlib
+import sqlite3
+import threading
+import time
+
+from data.page_cache import CACHE_DIR
+from data.metrics import CACHE_REQUESTS, LLM_TOKENS
+from data.rate_limit import INTERACTIVE, CHARS_PER_TOKEN, call_with_retries, estimate_tokens, get_scheduler
+
+# Seconds after which a cached LLM response is discarded
+LLM_CACHE_TTL = 7 * 24 * 60 * 60
+
+# Upper bound for the total size of cached responses
+LLM_CACHE_MAX_BYTES = 50 * 1024 * 1024
+
+# Set LLM_CACHE=0 to bypass the cache and always call the API
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE", "1") != "0"
+
+def request_key(model, messages, **params):
+    """
+    Content address of a chat completion request: hash of model, messages and sampling params
+    """
+    payload = json.dumps({"model": model, "messages": messages, "params": params},
+                         sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class LLMCache:
+    """
+    Persistent memoization of chat completion responses backed by SQLite.
+
+    Entries older than the TTL are ignored and removed, and the least recently used entries
+    are evicted once the total size exceeds max_bytes.
+    """
+    def __init__(self, path=None, ttl=LLM_CACHE_TTL, max_bytes=LLM_CACHE_MAX_BYTES, enabled=LLM_CACHE_ENABLED):
+        self.path = path or os.path.join(CACHE_DIR, "llm.sqlite")
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model TEXT,
+                content TEXT,
+                size INTEGER,
+                created_at REAL,
+                accessed_at REAL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)")
+        self._conn.commit()
+
+    def get(self, key):
+        """
+        Return the cached response content for a key, or None
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT content, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[1] >= self.ttl:
+                if row is not None:
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._conn.commit()
+                self.misses += 1
+                CACHE_REQUESTS.inc(cache="llm", result="miss")
+                return None
+
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            CACHE_REQUESTS.inc(cache="llm", result="hit")
+            return row[0]
+
+    def put(self, key, model, content):
+        """
+        Store the response content for a key
+        """
+        now = time.time()
+        size = len(content.encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, content, size, now, now)
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """
+        Remove least recently used entries until the cache fits within max_bytes
+        """
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY accessed_at").fetchall():
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            self.evictions += 1
+
+    def stats(self):
+        """
+        Return hit/miss counters and the current cache size
+        """
+        with self._lock:
+            entries, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": entries,
+            "bytes": total,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+_llm_cache = None
+_llm_cache_lock = threading.Lock()
+
+def get_llm_cache():
+    """
+    Return the process-wide LLM response cache, creating it on first use
+    """
+    global _llm_cache
+    with _llm_cache_lock:
+        if _llm_cache is None:
+            _llm_cache = LLMCache()
+        return _llm_cache
+
+class TokenUsage:
+    """
+    Thread-safe running total of tokens billed by the API (cache hits cost nothing)
+    """
+    def __init__(self):
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self._lock = threading.Lock()
+
+    def record(self, usage, model):
+        if usage is None:
+            return
+        with self._lock:
+            self.requests += 1
+            self.prompt_tokens += usage.prompt_tokens or 0
+            self.completion_tokens += usage.completion_tokens or 0
+        LLM_TOKENS.inc(usage.prompt_tokens or 0, model=model, kind="prompt")
+        LLM_TOKENS.inc(usage.completion_tokens or 0, model=model, kind="completion")
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+                "total_tokens": self.prompt_tokens + self.completion_tokens,
+            }
+
+# Process-wide token usage of all chat completions
+token_usage = TokenUsage()
+
+def _active_cache(use_cache):
+    cache = get_llm_cache() if use_cache else None
+    return cache if cache and cache.enabled else None
+
+def _create(client, model, messages, priority, **params):
+    """
+    Send a chat completion request through the shared scheduler, which enforces the model's
+    rate limits and retries transient errors. Returns (parsed response, reserved tokens).
+    """
+    scheduler = get_scheduler()
+    reserved = estimate_tokens(messages, params)
+
+    def request():
+        raw = client.chat.completions.with_raw_response.create(model=model, messages=messages, **params)
+        scheduler.observe_headers(model, raw.headers)
+        return raw.parse()
+
+    return call_with_retries(request, model, reserved, priority=priority, scheduler=scheduler), reserved
+
+def _settle(model, reserved, usage):
+    if usage is not None and usage.total_tokens is not None:
+        get_scheduler().settle(model, reserved, usage.total_tokens)
+
+def cached_chat_completion(client, model, messages, use_cache=True, priority=INTERACTIVE, **params):
+    """
+    Call client.chat.completions.create and return the message content, reusing a cached
+    response for identical (model, messages, params) requests. Requests go through the shared
+    rate-limit scheduler at the given priority (INTERACTIVE or BATCH).
+    """
+    cache = _active_cache(use_cache)
+    key = request_key(model, messages, **params) if cache else None
+    if cache:
+        content = cache.get(key)
+        if content is not None:
+            return content
+
+    response, reserved = _create(client, model, messages, priority, **params)
+    usage = getattr(response, "usage", None)
+    token_usage.record(usage, model)
+    _settle(model, reserved, usage)
+    content = response.choices[0].message.content
+
+    if cache and content:
+        cache.put(key, model, content)
+    return content
+
+def stream_chat_completion(client, model, messages, use_cache=True, priority=INTERACTIVE, **params):
+    """
+    Streaming counterpart of cached_chat_completion: yield the message content as it is
+    generated. A cached response is yielded in one piece; a complete streamed response is
+    cached under the same key as the non-streaming request.
+    """
+    cache = _active_cache(use_cache)
+    key = request_key(model, messages, **params) if cache else None
+    if cache:
+        content = cache.get(key)
+        if content is not None:
+            yield content
+            return
+
+    parts = []
+    settled = False
+    stream, reserved = _create(client, model, messages, priority, stream=True,
+                               stream_options={"include_usage": True}, **params)
+    try:
+        for chunk in stream:
+            # The final chunk carries the usage of the whole request
+            usage = getattr(chunk, "usage", None)
+            token_usage.record(usage, model)
+            if usage is not None and usage.total_tokens is not None:
+                _settle(model, reserved, usage)
+                settled = True
+            if chunk.choices and chunk.choices[0].delta.content:
+                parts.append(chunk.choices[0].delta.content)
+                yield parts[-1]
+    finally:
+        # Abandoned by the consumer (GeneratorExit) or failed before the usage arrived: stop the
+        # generation and charge the budget for the prompt and what was generated so far
+        if not settled:
+            stream.close()
+            prompt_tokens = sum(len(message.get("content") or "") for message in messages) // CHARS_PER_TOKEN + 1
+            get_scheduler().settle(model, reserved, prompt_tokens + len("".join(parts)) // CHARS_PER_TOKEN)
+
+    # An empty completion is not worth replaying from the cache
+    if cache and parts:
+        cache.put(key, model, "".join(parts))
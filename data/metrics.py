@@ -0,0 +1,220 @@
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds (seconds) of the stage latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+class Counter:
+    """
+    Monotonic counter with optional labels
+    """
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple((name, labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def values(self):
+        """
+        Return {label tuple: value}
+        """
+        with self._lock:
+            return dict(self._values)
+
+    def samples(self):
+        return [(self.name, key, value) for key, value in sorted(self.values().items())]
+
+class Histogram:
+    """
+    Cumulative histogram with optional labels, in the Prometheus bucket layout
+    """
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple((name, labels[name]) for name in self.labelnames)
+        with self._lock:
+            series = self._series.setdefault(key, {"counts": [0] * len(self.buckets), "count": 0, "sum": 0.0})
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["counts"][i] += 1
+            series["count"] += 1
+            series["sum"] += value
+
+    def series(self):
+        """
+        Return {label tuple: {"count", "sum", "counts"}}
+        """
+        with self._lock:
+            return {key: dict(value, counts=list(value["counts"])) for key, value in self._series.items()}
+
+    def samples(self):
+        samples = []
+        for key, series in sorted(self.series().items()):
+            for bound, count in zip(self.buckets, series["counts"]):
+                samples.append((self.name + "_bucket", key + (("le", repr(float(bound))),), count))
+            samples.append((self.name + "_bucket", key + (("le", "+Inf"),), series["count"]))
+            samples.append((self.name + "_count", key, series["count"]))
+            samples.append((self.name + "_sum", key, series["sum"]))
+        return samples
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        """
+        Render all metrics in the Prometheus text exposition format
+        """
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "deep_research_stage_duration_seconds", "Wall time of each pipeline stage call", ["stage"]))
+STAGE_ERRORS = REGISTRY.register(Counter(
+    "deep_research_stage_errors_total", "Errors per pipeline stage and error class", ["stage", "error"]))
+DOWNLOADED_BYTES = REGISTRY.register(Counter(
+    "deep_research_downloaded_bytes_total", "Bytes of page bodies downloaded"))
+LLM_TOKENS = REGISTRY.register(Counter(
+    "deep_research_llm_tokens_total", "Tokens billed by the OpenAI API", ["model", "kind"]))
+BOILERPLATE_CHARS = REGISTRY.register(Counter(
+    "deep_research_boilerplate_chars_total", "Non-whitespace characters of learned per-domain boilerplate stripped"))
+LLM_RATE_LIMIT_WAIT = REGISTRY.register(Histogram(
+    "deep_research_llm_rate_limit_wait_seconds", "Time OpenAI requests waited for their model's rate budget", ["model"]))
+LLM_RETRIES = REGISTRY.register(Counter(
+    "deep_research_llm_retries_total", "OpenAI requests retried, by model and HTTP status or error class", ["model", "reason"]))
+CACHE_REQUESTS = REGISTRY.register(Counter(
+    "deep_research_cache_requests_total", "Cache lookups by cache and outcome", ["cache", "result"]))
+
+@contextmanager
+def track_stage(stage):
+    """
+    Record the wall time of a block as one call of a stage, and its exception class if it raises
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        record_error(stage, e)
+        raise
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage=stage)
+
+def record_error(stage, error):
+    """
+    Count an error of a stage that was handled without raising. error is an exception
+    or an error class name.
+    """
+    STAGE_ERRORS.inc(stage=stage, error=error if isinstance(error, str) else type(error).__name__)
+
+def render_prometheus():
+    return REGISTRY.render()
+
+def summary(since=None):
+    """
+    Per-stage calls, wall time and errors plus byte, token, retry and cache totals, for display.
+    The counters are process-wide; pass an earlier summary as since to get only what was
+    recorded after it.
+    """
+    errors = {}
+    for key, value in STAGE_ERRORS.values().items():
+        labels = dict(key)
+        errors[labels["stage"]] = errors.get(labels["stage"], 0) + value
+
+    stages = {}
+    for key, series in STAGE_SECONDS.series().items():
+        stage = dict(key)["stage"]
+        stages[stage] = {
+            "calls": series["count"],
+            "total_seconds": round(series["sum"], 3),
+            "mean_seconds": round(series["sum"] / series["count"], 3) if series["count"] else 0.0,
+            "errors": errors.get(stage, 0),
+        }
+
+    tokens = {}
+    for key, value in LLM_TOKENS.values().items():
+        labels = dict(key)
+        tokens[labels["kind"]] = tokens.get(labels["kind"], 0) + value
+
+    caches = {}
+    for key, value in CACHE_REQUESTS.values().items():
+        labels = dict(key)
+        caches.setdefault(labels["cache"], {})[labels["result"]] = value
+
+    current = {
+        "stages": stages,
+        "downloaded_bytes": sum(DOWNLOADED_BYTES.values().values()),
+        "tokens": tokens,
+        "llm_retries": sum(LLM_RETRIES.values().values()),
+        "caches": caches,
+    }
+    return _difference(current, since) if since else current
+
+def _difference(current, before):
+    """
+    Counters of a summary minus those of an earlier one, leaving out what did not change
+    """
+    stages = {}
+    for stage, values in current["stages"].items():
+        earlier = before["stages"].get(stage, {})
+        calls = values["calls"] - earlier.get("calls", 0)
+        errors = values["errors"] - earlier.get("errors", 0)
+        if not calls and not errors:
+            continue
+        total_seconds = round(values["total_seconds"] - earlier.get("total_seconds", 0.0), 3)
+        stages[stage] = {
+            "calls": calls,
+            "total_seconds": total_seconds,
+            "mean_seconds": round(total_seconds / calls, 3) if calls else 0.0,
+            "errors": errors,
+        }
+
+    caches = {}
+    for cache, results in current["caches"].items():
+        changed = {result: count - before["caches"].get(cache, {}).get(result, 0) for result, count in results.items()}
+        changed = {result: count for result, count in changed.items() if count}
+        if changed:
+            caches[cache] = changed
+
+    return {
+        "stages": stages,
+        "downloaded_bytes": current["downloaded_bytes"] - before["downloaded_bytes"],
+        "tokens": {kind: count - before["tokens"].get(kind, 0) for kind, count in current["tokens"].items()},
+        "llm_retries": current["llm_retries"] - before["llm_retries"],
+        "caches": caches,
+    }
@@ -0,0 +1,225 @@
+import os
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+from data.metrics import CACHE_REQUESTS
+
+# Directory holding the on-disk caches
+CACHE_DIR = os.getenv("DEEP_RESEARCH_CACHE_DIR", ".cache")
+
+# Seconds during which a cached page is served without contacting the server
+PAGE_CACHE_TTL = 60 * 60
+
+# Upper bound for the total size of cached page bodies and results
+PAGE_CACHE_MAX_BYTES = 200 * 1024 * 1024
+
+# Query parameters that never change the page content
+TRACKING_PARAMS = ("utm_", "fbclid", "gclid", "mc_cid", "mc_eid")
+
+def normalize_url(url):
+    """
+    Normalize a URL so trivially different spellings map to the same cache entry
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+
+    # Keep the port only if it is not the default one for the scheme
+    if parts.port and not (scheme == "http" and parts.port == 80) and not (scheme == "https" and parts.port == 443):
+        host = f"{host}:{parts.port}"
+
+    # Drop tracking parameters and sort the rest
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith(TRACKING_PARAMS)
+    )
+
+    path = parts.path or "/"
+    return urlunsplit((scheme, host, path, urlencode(query), ""))
+
+class CachedPage:
+    """
+    A cache entry for a single page
+    """
+    def __init__(self, key, etag, last_modified, result, fetched_at, ttl):
+        self.key = key
+        self.etag = etag
+        self.last_modified = last_modified
+        self.result = result
+        self.fetched_at = fetched_at
+        self.ttl = ttl
+
+    @property
+    def fresh(self):
+        return time.time() - self.fetched_at < self.ttl
+
+    def validators(self):
+        """
+        Headers for a conditional GET that revalidates this entry
+        """
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+class PageCache:
+    """
+    Persistent, size-bounded cache of fetched pages backed by SQLite.
+
+    Each entry stores the compressed raw body and the extracted result, together with the
+    ETag/Last-Modified validators. Entries younger than the TTL are served directly; older
+    ones are revalidated with a conditional GET. The least recently used entries are evicted
+    once the total size exceeds max_bytes.
+    """
+    def __init__(self, path=None, ttl=PAGE_CACHE_TTL, max_bytes=PAGE_CACHE_MAX_BYTES):
+        self.path = path or os.path.join(CACHE_DIR, "pages.sqlite")
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.revalidations = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                key TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                body BLOB,
+                result TEXT,
+                size INTEGER,
+                fetched_at REAL,
+                accessed_at REAL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS pages_accessed_at ON pages (accessed_at)")
+        self._conn.commit()
+
+    def lookup(self, url):
+        """
+        Return the CachedPage for a URL, or None if it is not cached
+        """
+        key = normalize_url(url)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified, result, fetched_at FROM pages WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                CACHE_REQUESTS.inc(cache="page", result="miss")
+                return None
+
+            self._conn.execute("UPDATE pages SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+
+        entry = CachedPage(key, row[0], row[1], json.loads(row[2]), row[3], self.ttl)
+        with self._lock:
+            if entry.fresh:
+                self.hits += 1
+            else:
+                self.stale += 1
+        CACHE_REQUESTS.inc(cache="page", result="hit" if entry.fresh else "stale")
+        return entry
+
+    def revalidated(self, entry):
+        """
+        Mark an entry as confirmed unchanged by the server (HTTP 304)
+        """
+        now = time.time()
+        with self._lock:
+            self.revalidations += 1
+            CACHE_REQUESTS.inc(cache="page", result="revalidated")
+            self._conn.execute(
+                "UPDATE pages SET fetched_at = ?, accessed_at = ? WHERE key = ?", (now, now, entry.key)
+            )
+            self._conn.commit()
+        entry.fetched_at = now
+        return entry.result
+
+    def store(self, url, body, result, etag=None, last_modified=None):
+        """
+        Store the raw body and extracted result for a URL
+        """
+        key = normalize_url(url)
+        compressed = zlib.compress(body or b"")
+        serialized = json.dumps(result, ensure_ascii=False)
+        size = len(compressed) + len(serialized.encode("utf-8"))
+        now = time.time()
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, etag, last_modified, compressed, serialized, size, now, now)
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """
+        Remove least recently used entries until the cache fits within max_bytes
+        """
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        for key, size in self._conn.execute("SELECT key, size FROM pages ORDER BY accessed_at").fetchall():
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM pages WHERE key = ?", (key,))
+            total -= size
+            self.evictions += 1
+
+    def body(self, url):
+        """
+        Return the raw cached body for a URL, or None if it is not cached
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT body FROM pages WHERE key = ?", (normalize_url(url),)).fetchone()
+        return zlib.decompress(row[0]) if row else None
+
+    def stats(self):
+        """
+        Return hit/miss/revalidation counters and the current cache size
+        """
+        with self._lock:
+            entries, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM pages").fetchone()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "revalidations": self.revalidations,
+            "evictions": self.evictions,
+            "entries": entries,
+            "bytes": total,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM pages")
+            self._conn.commit()
+
+_page_cache = None
+_page_cache_lock = threading.Lock()
+
+def get_page_cache():
+    """
+    Return the process-wide page cache, creating it on first use
+    """
+    global _page_cache
+    with _page_cache_lock:
+        if _page_cache is None:
+            _page_cache = PageCache()
+        return _page_cache
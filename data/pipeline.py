@@ -0,0 +1,140 @@
+import math
+import queue
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from data.google_scrape import extract_content, HostThrottle, MAX_CONCURRENT_FETCHES, PER_HOST_MIN_INTERVAL
+from data.dedup import NearDuplicateIndex
+
+# Fetched articles waiting for a distillation worker; when it is full, fetch workers wait
+PIPELINE_QUEUE_SIZE = 4
+
+# Default number of distillation workers
+PIPELINE_DISTILL_WORKERS = 4
+
+# Share of the articles that can still be distilled which must be ready before the report starts
+REPORT_QUORUM_SHARE = 0.75
+
+# Seconds between checks for a stopped pipeline while waiting on the article queue
+POLL_INTERVAL = 0.1
+
+def stream_pipeline(urls, distill, quorum_share=REPORT_QUORUM_SHARE, queue_size=PIPELINE_QUEUE_SIZE,
+                    max_fetches=MAX_CONCURRENT_FETCHES, max_distillations=PIPELINE_DISTILL_WORKERS,
+                    per_host_interval=PER_HOST_MIN_INTERVAL, throttle=None, fetch=extract_content):
+    """
+    Fetch and distill the pages at urls as overlapping stages, yielding (event, index, payload)
+    tuples as they happen, where index is the URL's position in urls.
+
+    Fetch workers hand every extracted article to a bounded queue, from which distillation
+    workers take it as soon as the fetch completes. The events are:
+      "fetched"    the Article (failed fetches included; they are not distilled)
+      "duplicate"  the index of the earlier article this one nearly duplicates (not distilled)
+      "distilled"  distill(article), a dict whose duplicate_urls list collects the URLs of its
+                   near-duplicates, including ones found after it was distilled
+      "quorum"     sent once: the distilled results so far in rank order, when quorum_share of
+                   the articles that can still be distilled are ready (or all of them are)
+    The report can start from the quorum while the remaining articles finish. Closing the
+    generator early stops the workers.
+    """
+    throttle = throttle or HostThrottle(per_host_interval)
+    articles = queue.Queue(maxsize=max(1, queue_size))
+    events = queue.Queue()
+    stop = threading.Event()
+    duplicates = NearDuplicateIndex()
+    duplicates_lock = threading.Lock()
+    workers = max(1, max_distillations)
+
+    def put_article(item):
+        while not stop.is_set():
+            try:
+                articles.put(item, timeout=POLL_INTERVAL)
+                return
+            except queue.Full:
+                continue
+
+    def get_article():
+        while not stop.is_set():
+            try:
+                return articles.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                continue
+        return None
+
+    def fetch_one(i, url):
+        if stop.is_set():
+            return
+        throttle.wait(url)
+        article = fetch(url)
+        events.put(("fetched", i, article))
+        if article.ok:
+            put_article((i, article))
+
+    def produce():
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, max_fetches)) as executor:
+                futures = [executor.submit(fetch_one, i, url) for i, url in enumerate(urls)]
+            for future in futures:
+                if future.exception() is not None:
+                    events.put(("error", None, future.exception()))
+        finally:
+            # One end marker per distillation worker
+            for _ in range(workers):
+                put_article(None)
+
+    def consume():
+        try:
+            while True:
+                item = get_article()
+                if item is None:
+                    return
+                i, article = item
+                with duplicates_lock:
+                    original = duplicates.add(i, article.content)
+                if original is not None:
+                    events.put(("duplicate", i, original))
+                    continue
+                events.put(("distilled", i, distill(article)))
+        except Exception as e:
+            events.put(("error", None, e))
+        finally:
+            events.put(("finished", None, None))
+
+    threading.Thread(target=produce, daemon=True).start()
+    for _ in range(workers):
+        threading.Thread(target=consume, daemon=True).start()
+
+    distilled = {}
+    duplicate_urls = defaultdict(list)
+    dropped = 0
+    finished = 0
+    quorum_sent = False
+    try:
+        while finished < workers:
+            event, i, payload = events.get()
+            if event == "finished":
+                finished += 1
+                continue
+            if event == "error":
+                raise payload
+
+            if event == "fetched" and not payload.ok:
+                dropped += 1
+            elif event == "duplicate":
+                dropped += 1
+                duplicate_urls[payload].append(urls[i])
+                if payload in distilled:
+                    distilled[payload]["duplicate_urls"].append(urls[i])
+            elif event == "distilled":
+                payload["duplicate_urls"].extend(duplicate_urls[i])
+                distilled[i] = payload
+            yield event, i, payload
+
+            if not quorum_sent and distilled and len(distilled) >= math.ceil(quorum_share * (len(urls) - dropped)):
+                quorum_sent = True
+                yield "quorum", None, [distilled[k] for k in sorted(distilled)]
+
+        if not quorum_sent:
+            yield "quorum", None, [distilled[k] for k in sorted(distilled)]
+    finally:
+        stop.set()
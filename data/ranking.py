@@ -0,0 +1,133 @@
+import math
+import re
+from collections import Counter
+
+from data.report import count_tokens
+
+# Approximate number of words per chunk
+CHUNK_WORDS = 120
+
+# Maximum number of chunks kept per article
+TOP_K_CHUNKS = 8
+
+# Maximum number of tokens of article content sent to distillation
+ARTICLE_TOKEN_BUDGET = 1500
+
+# BM25 parameters
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+')
+WORD_PATTERN = re.compile(r'\w+')
+
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have in is it its of on or that the this to was were will with
+what when where which who why how about into than then there these those their they them our we you
+""".split())
+
+def tokenize(text):
+    """
+    Lowercase word tokens without stopwords
+    """
+    return [word for word in WORD_PATTERN.findall(text.lower()) if word not in STOPWORDS]
+
+def split_into_chunks(text, chunk_words=CHUNK_WORDS):
+    """
+    Split text into chunks of whole sentences of at most chunk_words words
+    """
+    chunks = []
+    current = []
+    current_words = 0
+
+    for sentence in SENTENCE_BOUNDARY.split(text):
+        words = sentence.split()
+
+        # Break run-on text without sentence punctuation into word windows
+        for start in range(0, len(words), chunk_words):
+            window = words[start:start + chunk_words]
+            if current and current_words + len(window) > chunk_words:
+                chunks.append(" ".join(current))
+                current = []
+                current_words = 0
+            current.append(" ".join(window))
+            current_words += len(window)
+
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+class BM25Index:
+    """
+    In-memory Okapi BM25 index over a list of text chunks
+    """
+    def __init__(self, chunks, k1=BM25_K1, b=BM25_B):
+        self.k1 = k1
+        self.b = b
+        self.term_freqs = [Counter(tokenize(chunk)) for chunk in chunks]
+        self.lengths = [sum(tf.values()) for tf in self.term_freqs]
+        self.avg_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0
+
+        doc_freqs = Counter()
+        for tf in self.term_freqs:
+            doc_freqs.update(tf.keys())
+        n = len(chunks)
+        self.idf = {term: math.log(1 + (n - df + 0.5) / (df + 0.5)) for term, df in doc_freqs.items()}
+
+    def scores(self, query):
+        """
+        BM25 score of every chunk for the query
+        """
+        terms = [term for term in set(tokenize(query)) if term in self.idf]
+        results = []
+        for tf, length in zip(self.term_freqs, self.lengths):
+            score = 0.0
+            norm = self.k1 * (1 - self.b + self.b * length / self.avg_length) if self.avg_length else self.k1
+            for term in terms:
+                freq = tf.get(term)
+                if freq:
+                    score += self.idf[term] * freq * (self.k1 + 1) / (freq + norm)
+            results.append(score)
+        return results
+
+def focus_articles(articles, user_query, top_k=TOP_K_CHUNKS, token_budget=ARTICLE_TOKEN_BUDGET):
+    """
+    Return copies of the articles whose content keeps only the chunks most relevant to the query.
+
+    One BM25 index is built over the chunks of all articles. For each article the top_k best
+    scoring chunks are kept within token_budget, in their original order. Articles without any
+    matching chunk keep their leading chunks. URL and publication date are left untouched.
+    """
+    article_chunks = [split_into_chunks(article.content) for article in articles]
+    index = BM25Index([chunk for chunks in article_chunks for chunk in chunks])
+    all_scores = index.scores(user_query)
+
+    focused = []
+    offset = 0
+    for article, chunks in zip(articles, article_chunks):
+        scores = all_scores[offset:offset + len(chunks)]
+        offset += len(chunks)
+
+        # Best chunks first; stable sort keeps document order for ties (including all-zero scores)
+        ranked = sorted(range(len(chunks)), key=lambda i: -scores[i])
+
+        selected = []
+        used_tokens = 0
+        for i in ranked[:top_k]:
+            tokens = count_tokens(chunks[i])
+            if selected and used_tokens + tokens > token_budget:
+                continue
+            selected.append(i)
+            used_tokens += tokens
+
+        # Mark gaps where chunks were left out
+        parts = []
+        previous = None
+        for i in sorted(selected):
+            if previous is not None:
+                parts.append(" " if i == previous + 1 else " ... ")
+            parts.append(chunks[i])
+            previous = i
+
+        focused.append(article.replace(content="".join(parts)))
+
+    return focused
@@ -0,0 +1,293 @@
+import os
+import heapq
+import random
+import itertools
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import openai
+
+from data.metrics import LLM_RATE_LIMIT_WAIT, LLM_RETRIES
+
+# Request priorities: lower values are served first when a model's budget is contended
+INTERACTIVE = 0
+BATCH = 1
+
+# Requests and tokens per minute allowed per model. Override with OPENAI_RATE_LIMITS,
+# e.g. "o1=500/30000,gpt-4o-mini=500/200000"; the limits reported in the API's
+# x-ratelimit-* response headers replace these once a response has been seen.
+DEFAULT_RATE_LIMITS = {
+    "o1": (500, 450000),
+    "gpt-4-turbo": (500, 450000),
+    "gpt-4o-mini": (5000, 2000000),
+    "gpt-3.5-turbo": (3500, 2000000),
+}
+
+# Limits of models without an entry above
+FALLBACK_RATE_LIMIT = (500, 200000)
+
+# Completion tokens reserved for a request that does not set max_tokens; corrected from the usage afterwards
+DEFAULT_COMPLETION_TOKENS = 4000
+
+# Rough characters-per-token ratio used to estimate prompt sizes before sending
+CHARS_PER_TOKEN = 4
+
+# Retries of a request after rate-limit (429), server (5xx), timeout and connection errors
+MAX_RETRIES = 6
+
+# Exponential backoff: the ceiling doubles from BACKOFF_BASE per attempt up to BACKOFF_MAX seconds,
+# and the actual delay is drawn between half the ceiling and the ceiling
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+
+# Longest Retry-After honored, in seconds
+MAX_RETRY_AFTER = 120.0
+
+def parse_rate_limits(spec):
+    """
+    Parse "model=rpm/tpm,model=rpm/tpm" into {model: (rpm, tpm)}
+    """
+    limits = {}
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        model, _, values = entry.partition("=")
+        rpm, _, tpm = values.partition("/")
+        limits[model.strip()] = (int(rpm), int(tpm))
+    return limits
+
+class TokenBucket:
+    """
+    Budget that refills continuously at per_minute units per minute, up to per_minute.
+    The level can go negative when a request turns out to cost more than it reserved.
+    """
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.level = float(per_minute)
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.capacity / 60)
+        self.updated = now
+
+    def delay(self, amount, now):
+        """
+        Seconds until amount can be taken (amounts above the capacity need a full bucket)
+        """
+        self._refill(now)
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing * 60 / self.capacity)
+
+    def take(self, amount, now):
+        self._refill(now)
+        self.level -= min(amount, self.capacity)
+
+    def give_back(self, amount, now):
+        self._refill(now)
+        self.level = min(self.capacity, self.level + amount)
+
+    def set_capacity(self, per_minute, now):
+        self._refill(now)
+        self.capacity = float(per_minute)
+        self.level = min(self.level, self.capacity)
+
+class _ModelBudget:
+    def __init__(self, rpm, tpm):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.paused_until = 0.0
+        self.waiting = []
+
+class LLMScheduler:
+    """
+    Process-wide admission control for OpenAI requests.
+
+    Each model has a requests-per-minute and a tokens-per-minute token bucket. A request
+    waits until both can cover it (its prompt estimate plus its completion allowance);
+    waiting requests are admitted in priority order, then first come first served, so
+    interactive requests overtake queued batch work. A 429 pauses the whole model for its
+    Retry-After. Budgets are per process: give each process its share of the account limits.
+    """
+    def __init__(self, limits=None, fallback=FALLBACK_RATE_LIMIT):
+        self.limits = dict(DEFAULT_RATE_LIMITS if limits is None else limits)
+        self.fallback = fallback
+        self._budgets = {}
+        self._condition = threading.Condition()
+        self._sequence = itertools.count()
+
+    def _budget(self, model):
+        budget = self._budgets.get(model)
+        if budget is None:
+            budget = self._budgets[model] = _ModelBudget(*self.limits.get(model, self.fallback))
+        return budget
+
+    def acquire(self, model, tokens, priority=INTERACTIVE):
+        """
+        Block until a request of the given estimated size may be sent, and charge it
+        """
+        start = time.monotonic()
+        with self._condition:
+            budget = self._budget(model)
+            ticket = (priority, next(self._sequence))
+            heapq.heappush(budget.waiting, ticket)
+            try:
+                while True:
+                    if budget.waiting[0] != ticket:
+                        self._condition.wait()
+                        continue
+                    now = time.monotonic()
+                    delay = max(budget.paused_until - now, budget.requests.delay(1, now), budget.tokens.delay(tokens, now))
+                    if delay <= 0:
+                        budget.requests.take(1, now)
+                        budget.tokens.take(tokens, now)
+                        break
+                    self._condition.wait(delay)
+            finally:
+                budget.waiting.remove(ticket)
+                heapq.heapify(budget.waiting)
+                self._condition.notify_all()
+        LLM_RATE_LIMIT_WAIT.observe(time.monotonic() - start, model=model)
+
+    def settle(self, model, reserved, used):
+        """
+        Correct a request's token charge from its estimate to the tokens it actually used
+        """
+        with self._condition:
+            self._budget(model).tokens.give_back(reserved - used, time.monotonic())
+            self._condition.notify_all()
+
+    def pause(self, model, seconds):
+        """
+        Hold back all requests to a model for the given number of seconds
+        """
+        with self._condition:
+            budget = self._budget(model)
+            budget.paused_until = max(budget.paused_until, time.monotonic() + seconds)
+
+    def observe_headers(self, model, headers):
+        """
+        Adopt the account limits and remaining budget reported in x-ratelimit-* response headers
+        """
+        try:
+            limit_requests = headers.get("x-ratelimit-limit-requests")
+            limit_tokens = headers.get("x-ratelimit-limit-tokens")
+            remaining_tokens = headers.get("x-ratelimit-remaining-tokens")
+            with self._condition:
+                budget = self._budget(model)
+                now = time.monotonic()
+                if limit_requests:
+                    budget.requests.set_capacity(int(limit_requests), now)
+                if limit_tokens:
+                    budget.tokens.set_capacity(int(limit_tokens), now)
+                if remaining_tokens:
+                    # Other processes sharing the API key may have used part of the budget
+                    budget.tokens.level = min(budget.tokens.level, float(remaining_tokens))
+        except ValueError:
+            pass
+
+    def stats(self):
+        """
+        Return {model: {"requests", "tokens", "waiting"}} with the current bucket levels
+        """
+        with self._condition:
+            now = time.monotonic()
+            stats = {}
+            for model, budget in self._budgets.items():
+                budget.requests._refill(now)
+                budget.tokens._refill(now)
+                stats[model] = {
+                    "requests": round(budget.requests.level, 1),
+                    "tokens": round(budget.tokens.level),
+                    "waiting": len(budget.waiting),
+                }
+            return stats
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+def get_scheduler():
+    """
+    Return the process-wide LLM scheduler, creating it on first use
+    """
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            limits = dict(DEFAULT_RATE_LIMITS)
+            limits.update(parse_rate_limits(os.getenv("OPENAI_RATE_LIMITS", "")))
+            _scheduler = LLMScheduler(limits)
+        return _scheduler
+
+def estimate_tokens(messages, params):
+    """
+    Tokens a chat completion request counts against the budget: prompt estimate plus completion allowance
+    """
+    prompt_chars = sum(len(message.get("content") or "") for message in messages)
+    completion = params.get("max_tokens") or params.get("max_completion_tokens") or DEFAULT_COMPLETION_TOKENS
+    return prompt_chars // CHARS_PER_TOKEN + 1 + completion
+
+def retry_after(error):
+    """
+    Seconds the API asked us to wait before retrying, or None
+    """
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+    try:
+        if headers.get("retry-after-ms"):
+            return min(float(headers["retry-after-ms"]) / 1000, MAX_RETRY_AFTER)
+        value = headers.get("retry-after")
+        if value:
+            try:
+                seconds = float(value)
+            except ValueError:
+                seconds = parsedate_to_datetime(value).timestamp() - time.time()
+            return min(max(0.0, seconds), MAX_RETRY_AFTER)
+    except (TypeError, ValueError):
+        pass
+    return None
+
+def is_retryable(error):
+    """
+    Whether an OpenAI error is transient: rate limits, server errors, timeouts and connection errors
+    """
+    if isinstance(error, openai.APIConnectionError):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        # An exhausted quota is a 429 too, but waiting does not help
+        if getattr(error, "code", None) == "insufficient_quota":
+            return False
+        return error.status_code in (408, 409, 429) or error.status_code >= 500
+    return False
+
+def backoff_delay(attempt):
+    """
+    Jittered exponential backoff for the given retry attempt (0 for the first retry)
+    """
+    ceiling = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt)
+    return random.uniform(ceiling / 2, ceiling)
+
+def call_with_retries(request, model, tokens, priority=INTERACTIVE, max_retries=MAX_RETRIES, scheduler=None):
+    """
+    Send request() once the model's budget allows, retrying transient errors with jittered
+    exponential backoff, or after the Retry-After the API asked for
+    """
+    scheduler = scheduler or get_scheduler()
+    for attempt in range(max_retries + 1):
+        scheduler.acquire(model, tokens, priority)
+        try:
+            return request()
+        except openai.OpenAIError as e:
+            # A rejected request does not use its token estimate
+            scheduler.settle(model, tokens, 0)
+            if attempt == max_retries or not is_retryable(e):
+                raise
+            delay = retry_after(e)
+            if delay is None:
+                delay = backoff_delay(attempt)
+            if isinstance(e, openai.RateLimitError):
+                scheduler.pause(model, delay)
+            status = getattr(e, "status_code", None)
+            LLM_RETRIES.inc(model=model, reason=str(status) if status else type(e).__name__)
+            print(f"Retrying {model} request in {delay:.1f}s after {type(e).__name__} "
+                  f"(attempt {attempt + 1}/{max_retries})")
+            time.sleep(delay)
@@ -0,0 +1,162 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from data.clients import get_openai_client
+from data.llm_cache import cached_chat_completion, stream_chat_completion
+from data.rate_limit import INTERACTIVE
+
+# tiktoken gives exact counts when installed; otherwise tokens are estimated from characters
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# Maximum number of source tokens sent in the final report prompt
+REPORT_TOKEN_BUDGET = 24000
+
+# Maximum number of source tokens packed into one intermediate summary request
+BATCH_TOKEN_BUDGET = 12000
+
+# Model and output size of the final report
+REPORT_MODEL = "gpt-4-turbo"
+REPORT_MAX_TOKENS = 4000
+
+# Model and output size of the intermediate summaries
+SUMMARY_MODEL = "gpt-4o-mini"
+SUMMARY_MAX_TOKENS = 1500
+
+# Maximum number of summary requests in flight at the same time
+MAX_CONCURRENT_SUMMARIES = 4
+
+# Safety net on the depth of the reduction tree
+MAX_REDUCE_LEVELS = 4
+
+# Rough characters-per-token ratio for English text, used without tiktoken
+CHARS_PER_TOKEN = 4
+
+_encoding = None
+
+def _get_encoding():
+    global _encoding
+    if _encoding is None and tiktoken is not None:
+        _encoding = tiktoken.get_encoding("cl100k_base")
+    return _encoding
+
+def count_tokens(text):
+    """
+    Count (or estimate, without tiktoken) the number of tokens in a text
+    """
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return len(text) // CHARS_PER_TOKEN + 1
+
+def truncate_to_tokens(text, max_tokens):
+    """
+    Truncate a text to at most max_tokens tokens
+    """
+    encoding = _get_encoding()
+    if encoding is not None:
+        tokens = encoding.encode(text, disallowed_special=())
+        if len(tokens) <= max_tokens:
+            return text
+        return encoding.decode(tokens[:max_tokens]) + "... [content truncated]"
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars] + "... [content truncated]"
+
+def pack_into_batches(sections, token_budget=BATCH_TOKEN_BUDGET):
+    """
+    Greedily pack sections, in order, into batches of at most token_budget tokens.
+    Sections larger than the budget are truncated and get a batch of their own.
+    """
+    batches = []
+    current = []
+    current_tokens = 0
+
+    for section in sections:
+        tokens = count_tokens(section)
+        if tokens > token_budget:
+            section = truncate_to_tokens(section, token_budget)
+            tokens = token_budget
+
+        if current and current_tokens + tokens > token_budget:
+            batches.append(current)
+            current = []
+            current_tokens = 0
+
+        current.append(section)
+        current_tokens += tokens
+
+    if current:
+        batches.append(current)
+    return batches
+
+def summarize_batch(batch, user_query, priority=INTERACTIVE):
+    """
+    Condense a batch of source sections into one summary that keeps source attribution
+    """
+    material = "\n\n".join(batch)
+    
+    prompt = f"""
+    Condense the following source material into a dense summary that will later be combined with
+    other summaries into a report addressing this query: {user_query}
+
+    Keep every fact, statistic, quote and insight that could matter for the report, and attribute each
+    point to its source URL and date. Drop repetition and filler.
+
+    SOURCE MATERIAL:
+    {material}
+    """
+
+    return cached_chat_completion(
+        get_openai_client(),
+        model=SUMMARY_MODEL,
+        messages=[
+            {"role": "system", "content": "You are an expert analyst who condenses research material without losing information or attribution."},
+            {"role": "user", "content": prompt}
+        ],
+        max_tokens=SUMMARY_MAX_TOKENS,
+        temperature=0.3,
+        priority=priority
+    )
+
+def reduce_to_budget(sections, user_query, token_budget=REPORT_TOKEN_BUDGET,
+                     batch_token_budget=BATCH_TOKEN_BUDGET, max_workers=MAX_CONCURRENT_SUMMARIES, priority=INTERACTIVE):
+    """
+    Return sections whose combined size fits within token_budget.
+
+    Sections that already fit are returned unchanged. Otherwise they are packed into batches
+    that are summarized in parallel (map), and the summaries are reduced again level by level
+    until they fit, so the final prompt stays bounded however many sources there are.
+    """
+    level = 0
+    while sum(count_tokens(section) for section in sections) > token_budget:
+        if level == MAX_REDUCE_LEVELS:
+            # Keep the leading sections that fit in the budget
+            return pack_into_batches(sections, token_budget)[0]
+
+        batches = pack_into_batches(sections, batch_token_budget)
+        print(f"Report reduction level {level + 1}: summarizing {len(sections)} sections in {len(batches)} batches")
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            sections = list(executor.map(lambda batch: summarize_batch(batch, user_query, priority), batches))
+        level += 1
+
+    return sections
+
+def stream_report(prompt, system_prompt, model=REPORT_MODEL, max_tokens=REPORT_MAX_TOKENS, temperature=0.5,
+                  priority=INTERACTIVE):
+    """
+    Generate a report, yielding the text as it is produced so callers can render it incrementally
+    """
+    yield from stream_chat_completion(
+        get_openai_client(),
+        model=model,
+        messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": prompt}
+        ],
+        max_tokens=max_tokens,
+        temperature=temperature,
+        priority=priority
+    )
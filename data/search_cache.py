@@ -0,0 +1,182 @@
+import os
+import re
+import json
+import sqlite3
+import threading
+import time
+import unicodedata
+
+from data.page_cache import CACHE_DIR
+from data.metrics import CACHE_REQUESTS
+
+# Seconds a cached search stays fresh: recent-news searches go stale quickly, others much later
+SEARCH_CACHE_TTL_RECENT = 30 * 60
+SEARCH_CACHE_TTL = 24 * 60 * 60
+
+# Upper bound for the number of cached searches
+SEARCH_CACHE_MAX_ENTRIES = 10000
+
+# Set SEARCH_CACHE=0 to always enhance the query and search again
+SEARCH_CACHE_ENABLED = os.getenv("SEARCH_CACHE", "1") != "0"
+
+# Characters that do not change a search: punctuation other than that found inside terms (C++, C#, U.S., AT&T, "quotes")
+IGNORED_CHARACTERS_PATTERN = re.compile(r"[^\w\s+#&$%.'\"-]")
+
+# Sentence punctuation at the end of a query
+TRAILING_PUNCTUATION_PATTERN = re.compile(r"[\s.]+$")
+
+def normalize_query(query):
+    """
+    Normalize a user query so trivially different spellings (case, spacing, punctuation,
+    Unicode forms) map to the same cache entry
+    """
+    query = unicodedata.normalize("NFKC", query).casefold()
+    query = query.replace("‘", "'").replace("’", "'").replace("“", '"').replace("”", '"')
+    query = IGNORED_CHARACTERS_PATTERN.sub(" ", query)
+    query = TRAILING_PUNCTUATION_PATTERN.sub("", query)
+    return " ".join(query.split())
+
+class SearchCache:
+    """
+    Persistent cache of searches backed by SQLite, mapping a normalized user query, its
+    recency flag and the number of results asked for to the enhanced query and the URLs the
+    search returned.
+
+    Entries expire after ttl_recent seconds for recent-news searches and after ttl seconds
+    otherwise. A request is answered by the smallest entry of its query that searched for at
+    least as many results, or by one whose search had already run out of results. The least
+    recently used entries are evicted beyond max_entries.
+    """
+    def __init__(self, path=None, ttl_recent=SEARCH_CACHE_TTL_RECENT, ttl=SEARCH_CACHE_TTL,
+                 max_entries=SEARCH_CACHE_MAX_ENTRIES, enabled=SEARCH_CACHE_ENABLED):
+        self.path = path or os.path.join(CACHE_DIR, "search.sqlite")
+        self.ttl_recent = ttl_recent
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        # Earlier versions kept one entry per query and recency flag, whatever the number of results
+        self._conn.execute("DROP TABLE IF EXISTS searches")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS search_results (
+                query TEXT,
+                recent INTEGER,
+                num_results INTEGER,
+                enhanced_query TEXT,
+                urls TEXT,
+                created_at REAL,
+                accessed_at REAL,
+                PRIMARY KEY (query, recent, num_results)
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS search_results_accessed_at ON search_results (accessed_at)")
+        self._conn.commit()
+
+    def get(self, user_query, recent_news, num_results):
+        """
+        Return (enhanced query, urls) of a fresh cached search with enough results, or None
+        """
+        key = (normalize_query(user_query), int(bool(recent_news)))
+        ttl = self.ttl_recent if recent_news else self.ttl
+        now = time.time()
+        with self._lock:
+            deleted = self._conn.execute(
+                "DELETE FROM search_results WHERE query = ? AND recent = ? AND created_at <= ?", key + (now - ttl,)
+            ).rowcount
+            if deleted:
+                self._conn.commit()
+
+            rows = self._conn.execute(
+                "SELECT num_results, enhanced_query, urls FROM search_results WHERE query = ? AND recent = ? "
+                "ORDER BY num_results", key
+            ).fetchall()
+            # A search asked for fewer results cannot answer, unless it got fewer than it asked for
+            match = None
+            for searched, enhanced_query, urls in rows:
+                urls = json.loads(urls)
+                if searched >= num_results or len(urls) < searched:
+                    match = searched, enhanced_query, urls
+                    break
+
+            if match is None:
+                self.misses += 1
+                CACHE_REQUESTS.inc(cache="search", result="miss")
+                return None
+
+            searched, enhanced_query, urls = match
+            self._conn.execute(
+                "UPDATE search_results SET accessed_at = ? WHERE query = ? AND recent = ? AND num_results = ?",
+                (now,) + key + (searched,)
+            )
+            self._conn.commit()
+            self.hits += 1
+            CACHE_REQUESTS.inc(cache="search", result="hit")
+            return enhanced_query, urls[:num_results]
+
+    def put(self, user_query, recent_news, num_results, enhanced_query, urls):
+        """
+        Store the outcome of a search for num_results results
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO search_results VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (normalize_query(user_query), int(bool(recent_news)), num_results, enhanced_query,
+                 json.dumps(urls), now, now)
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """
+        Remove least recently used entries until at most max_entries remain
+        """
+        excess = self._conn.execute("SELECT COUNT(*) FROM search_results").fetchone()[0] - self.max_entries
+        if excess <= 0:
+            return
+
+        self._conn.execute(
+            "DELETE FROM search_results WHERE rowid IN (SELECT rowid FROM search_results ORDER BY accessed_at LIMIT ?)",
+            (excess,)
+        )
+        self.evictions += excess
+
+    def stats(self):
+        """
+        Return hit/miss counters and the number of cached searches
+        """
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM search_results").fetchone()[0]
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": entries,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM search_results")
+            self._conn.commit()
+
+_search_cache = None
+_search_cache_lock = threading.Lock()
+
+def get_search_cache():
+    """
+    Return the process-wide search cache, creating it on first use
+    """
+    global _search_cache
+    with _search_cache_lock:
+        if _search_cache is None:
+            _search_cache = SearchCache()
+        return _search_cache
@@ -20,11 +20,11 @@ def distill_individual_article(article, user_query):
     Analyze the following news article content and extract ALL relevant information, facts, and insights,
     even if they seem only tangentially related to the query: "{user_query}"
     
-    SOURCE URL: {article['url']}
-    PUBLICATION DATE: {article['publication_date']}
+    SOURCE URL: {article.url}
+    PUBLICATION DATE: {article.publication_date}
     
     CONTENT:
-    {article['content']}
+    {article.content}
     
     Distill this article into key facts, quotes, statistics, and insights. Be comprehensive and capture ALL useful information,
     not just what seems immediately relevant to the query. Format your response as a bulleted list of clear, concise points.
@@ -40,14 +40,14 @@ def distill_individual_article(article, user_query):
             ]
         )
         return {
-            "url": article['url'],
-            "publication_date": article['publication_date'],
+            "url": article.url,
+            "publication_date": article.publication_date,
             "distilled_content": response.choices[0].message.content
         }
     except Exception as e:
         return {
-            "url": article['url'],
-            "publication_date": article['publication_date'],
+            "url": article.url,
+            "publication_date": article.publication_date,
             "distilled_content": f"Error in distillation: {str(e)}"
         }
 
@@ -112,8 +112,8 @@ def main():
                 # Store results in session state for later use
                 st.session_state.search_results = results
                 
-                # Filter out forbidden URLs for display count
-                accessible_results = [r for r in results if not r['content'].startswith("Error: HTTP error 403 Client Error: Forbidden for url:")]
+                # Count the pages that could be fetched
+                accessible_results = [r for r in results if r.ok]
                 
                 # Display the results
                 if results:
@@ -129,8 +129,8 @@ def main():
     if hasattr(st.session_state, 'search_results') and st.session_state.search_results:
         results = st.session_state.search_results
         
-        # Filter out forbidden URLs for display count
-        accessible_results = [r for r in results if not r['content'].startswith("Error: HTTP error 403 Client Error: Forbidden for url:")]
+        # Count the pages that could be fetched
+        accessible_results = [r for r in results if r.ok]
         
         st.success(f"Found {len(results)} results total, {len(accessible_results)} accessible")
         
@@ -142,24 +142,24 @@ def main():
             st.subheader("URLs")
             for i, item in enumerate(results, 1):
                 # Add indicator for forbidden URLs
-                if item['content'].startswith("Error: HTTP error 403 Client Error: Forbidden for url:"):
-                    st.write(f"{i}. {item['url']} ⚠️ (Access Forbidden)")
+                if item.forbidden:
+                    st.write(f"{i}. {item.url} ⚠️ (Access Forbidden)")
                 else:
-                    st.write(f"{i}. {item['url']}")
+                    st.write(f"{i}. {item.url}")
         
         with tab2:
             # Display detailed information
             st.subheader("Detailed Results")
             for i, item in enumerate(results, 1):
                 # Add indicator for forbidden URLs in the expander title
-                title = f"Result {i}: {item['url']}"
-                if item['content'].startswith("Error: HTTP error 403 Client Error: Forbidden for url:"):
+                title = f"Result {i}: {item.url}"
+                if item.forbidden:
                     title += " ⚠️ (Access Forbidden)"
                 
                 with st.expander(title):
-                    st.write(f"**URL:** {item['url']}")
-                    st.write(f"**Publication Date:** {item['publication_date']}")
-                    st.text_area(f"Content {i}", item['content'], height=200)
+                    st.write(f"**URL:** {item.url}")
+                    st.write(f"**Publication Date:** {item.publication_date}")
+                    st.text_area(f"Content {i}", item.content if item.ok else item.message, height=200)
         
         with tab3:
             st.subheader("Distilled Article Content")
@@ -182,8 +182,8 @@ def main():
             
             # If distillation is in progress, show the progress and perform the distillation
             if st.session_state.distillation_in_progress:
-                # Filter out content with 403 errors
-                filtered_content = [item for item in results if not item['content'].startswith("Error: HTTP error 403 Client Error: Forbidden for url:")]
+                # Filter out pages that could not be fetched
+                filtered_content = [item for item in results if item.ok]
                 
                 # Show initial status message
                 distillation_status.info(f"Starting distillation process for {len(filtered_content)} articles...")
@@ -202,13 +202,13 @@ def main():
                 
                 for i, article in enumerate(filtered_content):
                     # Update the status message with current article
-                    current_article_title = article['url'].split('/')[-1] if '/' in article['url'] else article['url']
+                    current_article_title = article.url.split('/')[-1] if '/' in article.url else article.url
                     article_progress.info(f"Distilling article {i+1}/{len(filtered_content)}: Processing '{current_article_title}'")
                     
                     # Display article details
                     article_details.markdown(f"""
-                    🔍 **Analyzing**: {article['url']}  
-                    📅 **Published**: {article['publication_date']}  
+                    🔍 **Analyzing**: {article.url}  
+                    📅 **Published**: {article.publication_date}  
                     """)
                     
                     # Show processing status
@@ -222,7 +222,7 @@ def main():
                     progress_bar.progress((i + 1) / len(filtered_content))
                     
                     # Indicate completion of this article
-                    completion_status.success(f"✅ Completed distillation of article {i+1}: {article['url']}")
+                    completion_status.success(f"✅ Completed distillation of article {i+1}: {article.url}")
                     
                     # Add a visual separator
                     st.write("---")
@@ -1,7 +1,6 @@
 import streamlit as st
 import sys
 import os
-from openai import OpenAI
 from fpdf import FPDF
 import io
 import base64
@@ -13,23 +12,27 @@ parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 sys.path.append(parent_dir)
 
 from data.google_scrape import search_and_extract
+from data.report import reduce_to_budget, stream_report
 
-# Initialize OpenAI client
-client = OpenAI()
-
-def analyze_with_chatgpt(content_list, user_query):
+def stream_analysis_with_chatgpt(content_list, user_query):
     """
-    Send content to ChatGPT and get analysis based on user query
+    Send content to ChatGPT and stream the analysis based on user query as it is generated
     """
-    # Filter out content with 403 errors
-    filtered_content = []
-    for item in content_list:
-        if not (item['content'].startswith("Error: HTTP error 403 Client Error: Forbidden for url:")):
-            filtered_content.append(item)
+    # Filter out pages that could not be fetched
+    filtered_content = [item for item in content_list if item.ok]
     
     # Prepare content for ChatGPT
-    content_text = "\n\n".join([f"Source: {item['url']}\nDate: {item['publication_date']}\n{item['content']}" 
-                               for item in filtered_content])
+    sections = [f"Source: {item.url}\nDate: {item.publication_date}\n{item.content}" 
+                for item in filtered_content]
+    
+    try:
+        # Summarize batches of sources in parallel until they fit in the report token budget
+        sections = reduce_to_budget(sections, user_query)
+    except Exception as e:
+        yield f"Error in ChatGPT analysis: {str(e)}"
+        return
+    
+    content_text = "\n\n".join(sections)
     
     # Create prompt for ChatGPT
     prompt = f"""
@@ -44,18 +47,19 @@ def analyze_with_chatgpt(content_list, user_query):
     
     # Call ChatGPT API with a model that has larger context window
     try:
-        response = client.chat.completions.create(
-            model="gpt-4-turbo",  # Using GPT-4-turbo for larger context window
-            messages=[
-                {"role": "system", "content": "You are an expert analyst who creates detailed, well-structured reports."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=4000,
-            temperature=0.5
+        # Uses GPT-4-turbo for its larger context window
+        yield from stream_report(
+            prompt,
+            "You are an expert analyst who creates detailed, well-structured reports."
         )
-        return response.choices[0].message.content
     except Exception as e:
-        return f"Error in ChatGPT analysis: {str(e)}"
+        yield f"Error in ChatGPT analysis: {str(e)}"
+
+def analyze_with_chatgpt(content_list, user_query):
+    """
+    Send content to ChatGPT and get analysis based on user query
+    """
+    return "".join(stream_analysis_with_chatgpt(content_list, user_query))
 
 def generate_pdf(report_content, query):
     """
@@ -141,8 +145,8 @@ def main():
                 # Store results in session state for later use
                 st.session_state.search_results = results
                 
-                # Filter out forbidden URLs for display count
-                accessible_results = [r for r in results if not r['content'].startswith("Error: HTTP error 403 Client Error: Forbidden for url:")]
+                # Count the pages that could be fetched
+                accessible_results = [r for r in results if r.ok]
                 
                 # Display the results
                 if results:
@@ -156,45 +160,42 @@ def main():
                         st.subheader("URLs")
                         for i, item in enumerate(results, 1):
                             # Add indicator for forbidden URLs
-                            if item['content'].startswith("Error: HTTP error 403 Client Error: Forbidden for url:"):
-                                st.write(f"{i}. {item['url']} ⚠️ (Access Forbidden)")
+                            if item.forbidden:
+                                st.write(f"{i}. {item.url} ⚠️ (Access Forbidden)")
                             else:
-                                st.write(f"{i}. {item['url']}")
+                                st.write(f"{i}. {item.url}")
                     
                     with tab2:
                         # Display detailed information
                         st.subheader("Detailed Results")
                         for i, item in enumerate(results, 1):
                             # Add indicator for forbidden URLs in the expander title
-                            title = f"Result {i}: {item['url']}"
-                            if item['content'].startswith("Error: HTTP error 403 Client Error: Forbidden for url:"):
+                            title = f"Result {i}: {item.url}"
+                            if item.forbidden:
                                 title += " ⚠️ (Access Forbidden)"
                             
                             with st.expander(title):
-                                st.write(f"**URL:** {item['url']}")
-                                st.write(f"**Publication Date:** {item['publication_date']}")
-                                st.text_area(f"Content {i}", item['content'], height=200)
+                                st.write(f"**URL:** {item.url}")
+                                st.write(f"**Publication Date:** {item.publication_date}")
+                                st.text_area(f"Content {i}", item.content if item.ok else item.message, height=200)
                     
                     with tab3:
                         st.subheader("Generate Analysis Report")
                         st.write("Generate a detailed analysis report based on the search results.")
                         
                         # Show info about filtered URLs
-                        forbidden_count = len(results) - len(accessible_results)
-                        if forbidden_count > 0:
-                            st.info(f"Note: {forbidden_count} URLs with 403 Forbidden errors will be excluded from the analysis.")
+                        failed_count = len(results) - len(accessible_results)
+                        if failed_count > 0:
+                            st.info(f"Note: {failed_count} URLs that could not be fetched will be excluded from the analysis.")
                         
                         analysis_query = st.text_area("Specify what you want to analyze about these results:", 
                                                      value=user_query, height=100)
                         
                         if st.button("Generate Analysis"):
                             with st.spinner("Analyzing content and generating report..."):
-                                # Analyze with ChatGPT (filtering happens inside the function)
-                                report_content = analyze_with_chatgpt(results, analysis_query)
-                                
-                                # Display the report in Streamlit
+                                # Display the report in Streamlit as it is generated (filtering happens inside the function)
                                 st.subheader("Generated Report")
-                                st.markdown(report_content)
+                                report_content = st.write_stream(stream_analysis_with_chatgpt(results, analysis_query))
                                 
                                 # Generate PDF
                                 pdf_base64 = generate_pdf(report_content, analysis_query)
@@ -213,8 +214,8 @@ def main():
     elif hasattr(st.session_state, 'search_results') and st.session_state.search_results:
         results = st.session_state.search_results
         
-        # Filter out forbidden URLs for display count
-        accessible_results = [r for r in results if not r['content'].startswith("Error: HTTP error 403 Client Error: Forbidden for url:")]
+        # Count the pages that could be fetched
+        accessible_results = [r for r in results if r.ok]
         
         st.success(f"Found {len(results)} results total, {len(accessible_results)} accessible")
         
@@ -226,45 +227,42 @@ def main():
             st.subheader("URLs")
             for i, item in enumerate(results, 1):
                 # Add indicator for forbidden URLs
-                if item['content'].startswith("Error: HTTP error 403 Client Error: Forbidden for url:"):
-                    st.write(f"{i}. {item['url']} ⚠️ (Access Forbidden)")
+                if item.forbidden:
+                    st.write(f"{i}. {item.url} ⚠️ (Access Forbidden)")
                 else:
-                    st.write(f"{i}. {item['url']}")
+                    st.write(f"{i}. {item.url}")
         
         with tab2:
             # Display detailed information
             st.subheader("Detailed Results")
             for i, item in enumerate(results, 1):
                 # Add indicator for forbidden URLs in the expander title
-                title = f"Result {i}: {item['url']}"
-                if item['content'].startswith("Error: HTTP error 403 Client Error: Forbidden for url:"):
+                title = f"Result {i}: {item.url}"
+                if item.forbidden:
                     title += " ⚠️ (Access Forbidden)"
                 
                 with st.expander(title):
-                    st.write(f"**URL:** {item['url']}")
-                    st.write(f"**Publication Date:** {item['publication_date']}")
-                    st.text_area(f"Content {i}", item['content'], height=200)
+                    st.write(f"**URL:** {item.url}")
+                    st.write(f"**Publication Date:** {item.publication_date}")
+                    st.text_area(f"Content {i}", item.content if item.ok else item.message, height=200)
         
         with tab3:
             st.subheader("Generate Analysis Report")
             st.write("Generate a detailed analysis report based on the search results.")
             
             # Show info about filtered URLs
-            forbidden_count = len(results) - len(accessible_results)
-            if forbidden_count > 0:
-                st.info(f"Note: {forbidden_count} URLs with 403 Forbidden errors will be excluded from the analysis.")
+            failed_count = len(results) - len(accessible_results)
+            if failed_count > 0:
+                st.info(f"Note: {failed_count} URLs that could not be fetched will be excluded from the analysis.")
             
             analysis_query = st.text_area("Specify what you want to analyze about these results:", 
                                          value=user_query, height=100)
             
             if st.button("Generate Analysis"):
                 with st.spinner("Analyzing content and generating report..."):
-                    # Analyze with ChatGPT (filtering happens inside the function)
-                    report_content = analyze_with_chatgpt(results, analysis_query)
-                    
-                    # Display the report in Streamlit
+                    # Display the report in Streamlit as it is generated (filtering happens inside the function)
                     st.subheader("Generated Report")
-                    st.markdown(report_content)
+                    report_content = st.write_stream(stream_analysis_with_chatgpt(results, analysis_query))
                     
                     # Generate PDF
                     pdf_base64 = generate_pdf(report_content, analysis_query)
@@ -0,0 +1,242 @@
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import tornado.iostream
+import tornado.web
+
+from batch import research
+from data.google_scrape import HostThrottle, MAX_CONCURRENT_FETCHES, PER_HOST_MIN_INTERVAL
+from data.metrics import render_prometheus
+from data.rate_limit import INTERACTIVE
+from app import MAX_CONCURRENT_DISTILLATIONS
+
+# Maximum number of jobs waiting for a worker; further submissions are rejected with 503
+MAX_QUEUED_JOBS = 100
+
+# Number of jobs processed at the same time
+JOB_WORKERS = 4
+
+# Number of finished jobs kept for result lookups
+MAX_FINISHED_JOBS = 1000
+
+# Seconds between keep-alive comments on idle event streams
+SSE_KEEPALIVE_INTERVAL = 15
+
+# Events after which a job emits nothing more
+FINAL_STAGES = ("done", "failed")
+
+class Job:
+    """
+    A research job and the progress events it has emitted so far
+    """
+    def __init__(self, query, recent):
+        self.id = uuid.uuid4().hex
+        self.query = query
+        self.recent = recent
+        self.status = "queued"
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.events = []
+        self._changed = asyncio.Condition()
+
+    @property
+    def finished(self):
+        return self.status in FINAL_STAGES
+
+    async def emit(self, stage, details=None):
+        async with self._changed:
+            self.events.append({"stage": stage, "time": time.time(), **(details or {})})
+            self._changed.notify_all()
+
+    async def wait_for_event(self, seen, timeout):
+        """
+        Wait until more than `seen` events exist or the timeout expires
+        """
+        async with self._changed:
+            try:
+                await asyncio.wait_for(self._changed.wait_for(lambda: len(self.events) > seen), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "query": self.query,
+            "recent": self.recent,
+            "status": self.status,
+            "result": self.result,
+            "error": self.error,
+        }
+
+class JobManager:
+    """
+    Bounded queue of research jobs processed by a pool of asyncio workers.
+
+    The pipeline stages are blocking, so each job runs on a thread; page fetches and LLM
+    requests share global thread pools across all jobs, as in batch mode.
+    """
+    def __init__(self, workers=JOB_WORKERS, max_queued=MAX_QUEUED_JOBS, max_fetches=MAX_CONCURRENT_FETCHES,
+                 max_llm_requests=MAX_CONCURRENT_DISTILLATIONS, per_host_interval=PER_HOST_MIN_INTERVAL):
+        self.jobs = OrderedDict()
+        self.queue = asyncio.Queue(maxsize=max_queued)
+        self.job_pool = ThreadPoolExecutor(max_workers=workers)
+        self.fetch_pool = ThreadPoolExecutor(max_workers=max_fetches)
+        self.llm_pool = ThreadPoolExecutor(max_workers=max_llm_requests)
+        self.throttle = HostThrottle(per_host_interval)
+        self.workers = [asyncio.ensure_future(self._worker()) for _ in range(workers)]
+
+    def submit(self, query, recent):
+        """
+        Queue a job, raising asyncio.QueueFull when the queue is at capacity
+        """
+        job = Job(query, recent)
+        self.queue.put_nowait(job)
+        self.jobs[job.id] = job
+        self._forget_old_jobs()
+        return job
+
+    def _forget_old_jobs(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self.jobs[job_id]
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self.queue.get()
+            job.status = "running"
+            await job.emit("started")
+
+            def progress(stage, details):
+                # Called from the job thread; hand the event over to the event loop
+                asyncio.run_coroutine_threadsafe(job.emit(stage, details), loop)
+
+            try:
+                # Requests of HTTP users are admitted ahead of queued batch work sharing the API key
+                job.result = await loop.run_in_executor(
+                    self.job_pool, partial(research, priority=INTERACTIVE), job.query, job.recent,
+                    self.fetch_pool, self.llm_pool, self.throttle, progress
+                )
+                job.status = "done"
+                await job.emit("done", {"status": job.result["status"]})
+            except Exception as e:
+                job.status = "failed"
+                job.error = f"{type(e).__name__}: {e}"
+                await job.emit("failed", {"error": job.error})
+            finally:
+                self.queue.task_done()
+
+class JsonHandler(tornado.web.RequestHandler):
+    def initialize(self, manager):
+        self.manager = manager
+
+    def write_json(self, data, status=200):
+        self.set_status(status)
+        self.set_header("Content-Type", "application/json")
+        self.finish(json.dumps(data, ensure_ascii=False))
+
+    def get_job(self, job_id):
+        job = self.manager.jobs.get(job_id)
+        if job is None:
+            raise tornado.web.HTTPError(404, reason="Unknown job")
+        return job
+
+class JobsHandler(JsonHandler):
+    def post(self):
+        """
+        Submit a job: {"query": "...", "recent": true}
+        """
+        try:
+            body = json.loads(self.request.body or b"{}")
+        except json.JSONDecodeError:
+            raise tornado.web.HTTPError(400, reason="Invalid JSON body")
+        if not isinstance(body, dict):
+            raise tornado.web.HTTPError(400, reason="JSON body must be an object")
+
+        query = body.get("query")
+        if not isinstance(query, str) or not query.strip():
+            raise tornado.web.HTTPError(400, reason="Missing query")
+
+        # "false" or 0 would be truthy; only a JSON boolean is accepted
+        recent = body.get("recent", True)
+        if not isinstance(recent, bool):
+            raise tornado.web.HTTPError(400, reason="recent must be true or false")
+
+        try:
+            job = self.manager.submit(query.strip(), recent)
+        except asyncio.QueueFull:
+            raise tornado.web.HTTPError(503, reason="Job queue is full")
+
+        self.set_header("Location", f"/jobs/{job.id}")
+        self.write_json({"job_id": job.id, "status": job.status}, status=202)
+
+class JobHandler(JsonHandler):
+    def get(self, job_id):
+        self.write_json(self.get_job(job_id).to_dict())
+
+class JobEventsHandler(JsonHandler):
+    async def get(self, job_id):
+        """
+        Stream the job's progress events as server-sent events until it finishes
+        """
+        job = self.get_job(job_id)
+        self.set_header("Content-Type", "text/event-stream")
+        self.set_header("Cache-Control", "no-cache")
+
+        seen = 0
+        while True:
+            # Replay earlier events, then follow new ones
+            new_events = job.events[seen:]
+            for event in new_events:
+                self.write(f"event: {event['stage']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n")
+            seen += len(new_events)
+            if not new_events:
+                self.write(": keep-alive\n\n")
+
+            try:
+                await self.flush()
+            except tornado.iostream.StreamClosedError:
+                return
+
+            if seen and job.events[seen - 1]["stage"] in FINAL_STAGES:
+                break
+            await job.wait_for_event(seen, SSE_KEEPALIVE_INTERVAL)
+
+        self.finish()
+
+class MetricsHandler(tornado.web.RequestHandler):
+    def get(self):
+        self.set_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.finish(render_prometheus())
+
+def make_app(manager):
+    return tornado.web.Application([
+        (r"/jobs", JobsHandler, {"manager": manager}),
+        (r"/jobs/([0-9a-f]+)", JobHandler, {"manager": manager}),
+        (r"/jobs/([0-9a-f]+)/events", JobEventsHandler, {"manager": manager}),
+        (r"/metrics", MetricsHandler),
+    ])
+
+async def serve(port, workers, max_queued):
+    manager = JobManager(workers=workers, max_queued=max_queued)
+    make_app(manager).listen(port)
+    print(f"Research service listening on http://localhost:{port}")
+    await asyncio.Event().wait()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the research pipeline as an HTTP job API.")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=JOB_WORKERS, help="Jobs processed at the same time")
+    parser.add_argument("--max-queued", type=int, default=MAX_QUEUED_JOBS, help="Maximum number of waiting jobs")
+    args = parser.parse_args(argv)
+    asyncio.run(serve(args.port, args.workers, args.max_queued))
+
+if __name__ == "__main__":
+    main()
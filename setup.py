@@ -15,6 +15,7 @@ setup(
         "requests>=2.26.0",
         "python-dotenv>=0.19.0",
         "googlesearch-python>=1.1.0",
+        "tornado>=6.0",
         "datetime",
     ],
     classifiers=[
@@ -29,6 +30,8 @@ setup(
     entry_points={
         "console_scripts": [
             "deep-research=app:main",
+            "deep-research-batch=batch:main",
+            "deep-research-service=service:main",
         ],
     },
 )
\ No newline at end of file